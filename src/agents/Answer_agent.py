@@ -3,27 +3,15 @@
 from dotenv import load_dotenv
 import os
 
-from langchain_core.runnables import RunnablePassthrough
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-
-import openai
+from langchain_core.prompts import ChatPromptTemplate
 
 from src.agents.state import DeepSearchState
+from src.utils.llm_provider import invoke_text
 
 load_dotenv()
 if os.getenv("GOOGLE_API_KEY") is None:
     raise ValueError("GEMINI_API_KEY is not set")
 
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
-
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_API_MODEL')
-
 
 def finalize_answer(state: DeepSearchState):
     """
@@ -71,17 +59,11 @@ def finalize_answer_by_gemini(state: DeepSearchState):
         Question: \n{state.research_topic}\n
         Answer:
     """
-    llm_model = ChatGoogleGenerativeAI(
-        model=gemini_model,
-        temperature=0.6,
-        max_retries=2,
-        api_key=gemini_api_key)
-
-    result = llm_model.invoke(answer_prompt)
+    result = invoke_text(state.llm, answer_prompt, temperature=0.6)
 
     return {
         "research_topic": state.research_topic,
-        "answer": result.content,
+        "answer": result,
         "patent_sources_gathered": state.patent_sources_gathered
     }
 
@@ -122,11 +104,8 @@ def finalize_answer_by_openai(state: DeepSearchState):
         ("system", answer_prompt),
         ("user", state.research_topic),
     ])
-    llm = ChatOpenAI(model_name=openai_model,
-                     temperature=0.6,
-                     )
-    pipeline = prompt_template | llm
-    response = pipeline.invoke({"query": state.research_topic, "context": state.patent_sources_gathered})
+    messages = prompt_template.format_messages(query=state.research_topic, context=state.patent_sources_gathered)
+    response = invoke_text(state.llm, messages, temperature=0.6)
 
     return {
         "research_topic": state.research_topic,
@@ -1,22 +1,14 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
 
 from src.agents.state import DeepSearchState
-import google.generativeai as genai
+from src.utils.utils import research_results_to_str, research_sources_to_str
+from src.utils.llm_provider import invoke_text
 
-import os
 from dotenv import load_dotenv
-import openai
 
 load_dotenv()
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
-
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_API_MODEL')
 
 
 def patent_deep_review(state: DeepSearchState):
@@ -76,20 +68,12 @@ def patent_deep_review_by_gemini(state: DeepSearchState):
             - Do not hallucinate.\n
             - Do not include any irrelevant information. \n
 
-            PATENT SUMMARIES: '''{state.patent_research_results}''' \n
+            PATENT SUMMARIES: '''{research_results_to_str(state.patent_research_results)}''' \n
             at the end of your report, provide a list of citations that only used in the report.
             """
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(patent_review_prompt,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.6,
-                                          top_k=5,
-                                          temperature=0.2)
-                                      )
-
-    state.patent_running_summary = f"{response.text}\n ## Sources: \n{state.patent_sources_gathered}"
+    response = invoke_text(state.llm, patent_review_prompt, temperature=0.2, top_p=0.6, top_k=5)
+
+    state.patent_running_summary = f"{response}\n ## Sources: \n{research_sources_to_str(state.patent_sources_gathered)}"
 
     return {"patent_running_summary": state.patent_running_summary}
 
@@ -134,22 +118,17 @@ def patent_deep_review_by_openai(state: DeepSearchState):
                 - Do not hallucinate.\n
                 - Do not include any irrelevant information. \n
 
-                PATENT SUMMARIES: '''{state.patent_research_results}''' \n
+                PATENT SUMMARIES: '''{research_results_to_str(state.patent_research_results)}''' \n
                 at the end of your report, provide a list of citations that only used in the report.
                 """
 
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.1,
-    )
-
     human_message_content = f"Create a Summary using the Context on this topic: \n <User Input> \n {topic} \n <User Input>\n\n"
-    response = llm_model.invoke(
-        [SystemMessage(content=patent_review_prompt),
-         HumanMessage(content=human_message_content)]
-    )
+    response = invoke_text(state.llm,
+                           [SystemMessage(content=patent_review_prompt),
+                            HumanMessage(content=human_message_content)],
+                           temperature=0.1)
 
-    state.patent_running_summary = f"## Summary\n{response.content}\n ## Sources:\n{state.patent_sources_gathered}"
+    state.patent_running_summary = f"## Summary\n{response}\n ## Sources:\n{research_sources_to_str(state.patent_sources_gathered)}"
 
     return {"patent_running_summary": state.patent_running_summary}
 
@@ -201,16 +180,9 @@ def article_deep_review(state: DeepSearchState):
         RESEARCH ARTICLE ABSTRACTS: '''{state.article_research_results}'''
         """
 
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(patent_review_prompt,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.6,
-                                          top_k=5,
-                                          temperature=0.2)
-                                      )
-    state.article_running_summary = f"## Summary\n{response.text}\n\n ## Sources:\n{state.article_sources_gathered}"
+    # the article review always ran on Gemini, top_p/top_k are Gemini sampling parameters
+    response = invoke_text('gemini', patent_review_prompt, temperature=0.2, top_p=0.6, top_k=5)
+    state.article_running_summary = f"## Summary\n{response}\n\n ## Sources:\n{state.article_sources_gathered}"
 
     return {"article_running_summary": state.article_running_summary}
 
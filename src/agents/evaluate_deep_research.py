@@ -1,10 +1,12 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
+from dataclasses import replace
+
 from typing_extensions import Literal
 
 from langgraph.types import Send
 
-from src.agents.state import DeepSearchState, QueryGenerationState, ReflectionState
+from src.agents.state import DeepSearchState, follow_up_queries
 
 import os
 from dotenv import load_dotenv
@@ -19,10 +21,11 @@ openai.api_key = os.getenv('OPENAI_API_KEY')
 openai_model = os.getenv('OPENAI_API_MODEL')
 
 
-def patent_deep_evaluation(state: DeepSearchState) -> Literal["patent_research", "patent_deep_review"]:
+def patent_deep_evaluation(state: DeepSearchState):
     """
     LangGraph routing function that directs the next step in the patent research process
         - Manages the research loop by deciding whether to continue collecting information or finalize the summary, based on the predefined maximum number of iterations.
+        - A new research loop runs one patent_research branch per follow-up query, concurrently.
     :param state:
     :return:
     """
@@ -32,9 +35,9 @@ def patent_deep_evaluation(state: DeepSearchState) -> Literal["patent_research",
         return patent_deep_evaluation_by_gemini(state)
 
 
-def patent_deep_evaluation_by_gemini(state: DeepSearchState) -> Literal["patent_research", "patent_deep_review"]:
+def patent_deep_evaluation_by_gemini(state: DeepSearchState):
     if not state.is_sufficient and state.research_loop_count <= state.max_research_loops:
-        return "patent_research"
+        return continue_to_patent_research(state)
     else:
         return "patent_deep_review"
 
@@ -65,12 +68,14 @@ def patent_deep_evaluation_by_openai(state: DeepSearchState):
         print("")
 
 
-def continue_to_patent_research(state: QueryGenerationState):
-    """LangGraph node that sends the search queries to the patent research agent.
+def continue_to_patent_research(state: DeepSearchState):
+    """LangGraph routing function that sends the follow-up queries to the patent research node.
 
-    This is used to spawn n number of patent research nodes, one for each search query.
+    This is used to spawn n number of patent research nodes, one for each follow-up query. The branches
+    run in the same step and their patents are merged by the state reducer.
     """
+    queries = follow_up_queries(state) or [state.patent_search_query]
     return [
-        Send("patent_research", {"search_query": search_query, "id": int(idx)})
-        for idx, search_query in enumerate(state["search_query"])
+        Send("patent_research", replace(state, patent_search_query=search_query, follow_up_query=None))
+        for search_query in queries
     ]
@@ -11,7 +11,7 @@ from src.agents.state import DeepSearchState, DeepSearchStateInput, DeepSearchSt
 from src.agents.analyzer_agent import patent_deep_review
 
 
-def route_research(state: DeepSearchState):
+def route_research(state: DeepSearchState, checkpointer=None):
     """LangGraph routing function that determines the next step in the patent research flow.
 
     Controls the research loop by deciding whether to continue gathering patent information
@@ -19,6 +19,7 @@ def route_research(state: DeepSearchState):
 
     Args:
         state: Current graph state containing the research loop count
+        checkpointer: optional LangGraph checkpointer, a failed run then resumes from its last completed node
     Returns:
         String literal indicating the next node to visit ("patent_research" or "patent_deep_review")
     """
@@ -33,10 +34,11 @@ def route_research(state: DeepSearchState):
     builder.add_edge(START, "generate_query")
     builder.add_edge("generate_query", "patent_research")
     builder.add_edge("patent_research", "reflection")
-    builder.add_conditional_edges("reflection", patent_deep_evaluation)
+    # a list of Send, one patent_research branch per follow-up query, or "patent_deep_review"
+    builder.add_conditional_edges("reflection", patent_deep_evaluation, ["patent_research", "patent_deep_review"])
     builder.add_edge("patent_deep_review", END)
 
-    graph = builder.compile()
+    graph = builder.compile(checkpointer=checkpointer)
 
 
     return graph
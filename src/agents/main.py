@@ -1,5 +1,7 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
+import threading
+import uuid
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
@@ -7,46 +9,112 @@ from src.agents.graph import route_research
 from src.agents.state import DeepSearchState
 
 from src.agents.passage_chat_graph import route_chat_research
+from src.utils.checkpointer import get_checkpointer
 
-def run_deep_research(system_prompt, user_prompt, llm):
+# research task -> function building its graph
+GRAPH_BUILDERS = {"report": route_research, "chat": route_chat_research}
+
+_compiled_graphs = {}
+_compiled_graphs_lock = threading.Lock()
+
+
+def get_graph(name: str):
+    """The compiled graph of a research task, compiled once and shared by all research sessions."""
+    with _compiled_graphs_lock:
+        if name not in _compiled_graphs:
+            _compiled_graphs[name] = GRAPH_BUILDERS[name](state=DeepSearchState, checkpointer=get_checkpointer())
+        return _compiled_graphs[name]
+
+
+def compile_graphs():
+    """Compile all graphs at startup, so no request pays the compilation."""
+    for name in GRAPH_BUILDERS:
+        get_graph(name)
+
+
+def new_thread_id():
+    """Unique thread id of a research session. Callers create it before the run to be able to resume it."""
+    return uuid.uuid4().hex
+
+
+def new_thread_config(thread_id: str = None):
+    """LangGraph config of a research session, with a unique thread id unless one is given."""
+    return {"configurable": {"thread_id": thread_id or new_thread_id()}}
+
+
+def can_resume():
+    """Whether failed research sessions can be resumed, i.e. a checkpointer is configured."""
+    return get_checkpointer() is not None
+
+
+def stream_results(graph, graph_input, thread_config):
+    """Execute the LangGraph workflow, streaming the results of each node: node name -> last output."""
     results = {}
-    graph = route_research(state=DeepSearchState)
-    # Initialize a LangGraph thread with a unique ID for state management.
-    thread_config = {"configurable": {"thread_id": "1"}}
-    # Execute the LangGraph workflow, streaming the results of each node.
-    for state in graph.stream(
-            {
-                "research_topic": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=user_prompt),
-                ],
-                "llm": llm
-            },
-            thread_config,
-    ):
+    for state in graph.stream(graph_input, thread_config):
         for node_name, node_output in state.items():
             results[node_name] = node_output
-
     return results
 
 
-def run_chat_deep_research(system_prompt, user_prompt, llm):
-    results = {}
-    graph = route_chat_research(state=DeepSearchState)
+def run_deep_research(system_prompt, user_prompt, llm, thread_id: str = None):
+    """
+    Run the report graph
+    :param thread_id: from new_thread_id(), needed to resume the session with resume_deep_research if it fails
+    :return: node name -> output
+    """
+    graph = get_graph("report")
     # Initialize a LangGraph thread with a unique ID for state management.
-    thread_config = {"configurable": {"thread_id": "1"}}
-    # Execute the LangGraph workflow, streaming the results of each node.
-    for state in graph.stream(
-            {
-                "research_topic": [
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content=user_prompt),
-                ],
-            },
-            thread_config,
-    ):
-        for node_name, node_output in state.items():
-            results[node_name] = node_output
+    thread_config = new_thread_config(thread_id)
+    return stream_results(graph,
+                          {
+                              "research_topic": [
+                                  SystemMessage(content=system_prompt),
+                                  HumanMessage(content=user_prompt),
+                              ],
+                              "llm": llm
+                          },
+                          thread_config)
+
+
+def run_chat_deep_research(system_prompt, user_prompt, llm, thread_id: str = None):
+    """
+    Run the passage QA graph
+    :param thread_id: from new_thread_id(), needed to resume the session with resume_chat_deep_research if it fails
+    :return: node name -> output
+    """
+    graph = get_graph("chat")
+    # Initialize a LangGraph thread with a unique ID for state management.
+    thread_config = new_thread_config(thread_id)
+    return stream_results(graph,
+                          {
+                              "research_topic": [
+                                  SystemMessage(content=system_prompt),
+                                  HumanMessage(content=user_prompt),
+                              ],
+                          },
+                          thread_config)
+
+
+def resume_research(thread_id: str, task: str = "report"):
+    """
+    Continue a failed or interrupted research session from its last completed node
+    :param thread_id: thread id the session was started with
+    :param task: "report" or "chat"
+    :return: node name -> output of the nodes run by the resumed part
+    """
+    graph = get_graph(task)
+    if graph.checkpointer is None:
+        raise ValueError("Resuming a research session requires CHECKPOINT_BACKEND to be set")
+    thread_config = new_thread_config(thread_id)
+    if not graph.get_state(thread_config).next:
+        raise ValueError(f"Research session {thread_id} has nothing left to run")
+    # no input: the graph continues from the checkpoint of the thread
+    return stream_results(graph, None, thread_config)
+
+
+def resume_deep_research(thread_id: str):
+    return resume_research(thread_id, "report")
 
-    return results
 
+def resume_chat_deep_research(thread_id: str):
+    return resume_research(thread_id, "chat")
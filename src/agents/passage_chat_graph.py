@@ -11,7 +11,7 @@ from src.agents.search_agent import patent_search, patent_passage_search
 from src.agents.state import DeepSearchState, DeepSearchStateInput, DeepSearchStateOutput
 
 
-def route_chat_research(state: DeepSearchState):
+def route_chat_research(state: DeepSearchState, checkpointer=None):
     """LangGraph routing function that determines the next step in the patent research flow.
 
     Controls the research loop by deciding whether to continue gathering information
@@ -19,6 +19,7 @@ def route_chat_research(state: DeepSearchState):
 
     Args:
         state: Current graph state containing the research loop count
+        checkpointer: optional LangGraph checkpointer, a failed run then resumes from its last completed node
 
     Returns:
         String literal indicating the next node to visit ("patent_passage_search" or "finalize_answer")
@@ -37,6 +38,6 @@ def route_chat_research(state: DeepSearchState):
     builder.add_conditional_edges("reflection", patent_deep_evaluation_for_QA)
     builder.add_edge("finalize_answer", END)
 
-    graph = builder.compile()
+    graph = builder.compile(checkpointer=checkpointer)
 
     return graph
@@ -1,32 +1,17 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 import re
 import string
-import os
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
-from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
 
 from pydantic import BaseModel, Field
 from typing import List
 
-import openai
-
 from src.agents.state import DeepSearchState
-from langchain_core.prompts import PromptTemplate
+from src.utils.llm_provider import invoke_text, invoke_structured
 
 load_dotenv()
 
-import google.generativeai as genai
-
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
-
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_API_MODEL')
-
 
 class SearchQueryList(BaseModel):
     query: List[str] = Field(
@@ -96,17 +81,7 @@ def create_query_by_openai(research_topic: str):
         Return only the query text.
         """
 
-    prompt_template = PromptTemplate(
-        input_variables=["research_topic"],
-        template=patent_query_prompt_template
-    )
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.1
-    )
-    output_parser = StrOutputParser()
-    chain = prompt_template | llm_model | output_parser
-    response = chain.invoke({"research_topic": research_topic})
+    response = invoke_text('gpt', patent_query_prompt_template, temperature=0.1)
     translator = str.maketrans('', '', string.punctuation)
     response = response.translate(translator)
     response = research_topic + ". " + response
@@ -147,17 +122,9 @@ def create_query_by_gemini(research_topic: str):
 
         Return only the query text.
         """
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(patent_query_prompt_template,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.6,
-                                          top_k=5,
-                                          temperature=0.1)
-                                      )
+    response = invoke_text('gemini', patent_query_prompt_template, temperature=0.1, top_p=0.6, top_k=5)
     translator = str.maketrans('', '', string.punctuation)
-    response = response.text.translate(translator)
+    response = response.translate(translator)
     response = research_topic + ". " + response
 
     return response
@@ -201,13 +168,7 @@ def create_queries_by_gemini(question: str):
                 ```
                 question: {question}"""
 
-    llm_model = ChatGoogleGenerativeAI(
-        model=gemini_model,
-        temperature=0.9,
-        max_retries=2,
-        api_key=gemini_api_key)
-
-    result = llm_model.with_structured_output(SearchQueryList).invoke(patent_query_prompt_template)
+    result = invoke_structured('gemini', patent_query_prompt_template, SearchQueryList, temperature=0.9)
 
     return {"search_queries": result.query}
 
@@ -241,17 +202,7 @@ def create_queries_by_openai(question: str):
                 ```
                 question: {question}"""
 
-    prompt_template = PromptTemplate(
-        input_variables=["question"],
-        template=patent_query_prompt_template
-    )
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.1
-    )
-    output_parser = StrOutputParser()
-    chain = prompt_template | llm_model | output_parser
-    response = chain.invoke({"question": question})
+    response = invoke_text('gpt', patent_query_prompt_template, temperature=0.1)
     translator = str.maketrans('', '', string.punctuation)
     response = response.translate(translator)
     response = question + ". " + response
@@ -1,26 +1,17 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
-from langgraph.types import Send
 
-from src.agents.state import DeepSearchState, QueryGenerationState, ReflectionState
+from src.agents.state import DeepSearchState, ReflectionState
+from src.utils.utils import research_results_to_str
+from src.utils.llm_provider import invoke_structured
 
 from typing import List
 from pydantic import BaseModel, Field
 
-import os
 from dotenv import load_dotenv
-import openai
 
 load_dotenv()
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
-
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_API_MODEL')
 
 
 class Reflection(BaseModel):
@@ -82,15 +73,9 @@ def patent_deep_reflection_by_gemini(state: DeepSearchState)  -> DeepSearchState
             }}
             ''' 
             Reflect carefully on the patent Summaries to identify knowledge gaps and produce a follow-up query. Then, produce your output in JSON format:   
-            PATENT SUMMARIES: '''{state.patent_research_results}''' \n
+            PATENT SUMMARIES: '''{research_results_to_str(state.patent_research_results)}''' \n
             """
-    llm_model = ChatGoogleGenerativeAI(
-        model=gemini_model,
-        temperature=0.5,
-        max_retries=2,
-        api_key=gemini_api_key)
-
-    result = llm_model.with_structured_output(Reflection).invoke(patent_reflection_prompt)
+    result = invoke_structured(state.llm, patent_reflection_prompt, Reflection, temperature=0.5)
 
     return {
         "is_sufficient": result.is_sufficient,
@@ -136,12 +121,7 @@ def patent_deep_reflection_by_openai(state: DeepSearchState)  -> ReflectionState
             Reflect carefully on the patent Summaries to identify knowledge gaps and produce a follow-up query. Then, produce your output in JSON format:   
             PATENT SUMMARIES: '''{state.patent_running_summary}''' \n
             """
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.5,
-    )
-
-    result = llm_model.with_structured_output(Reflection).invoke(patent_reflection_prompt)
+    result = invoke_structured(state.llm, patent_reflection_prompt, Reflection, temperature=0.5)
 
     return {
         "is_sufficient": result.is_sufficient,
@@ -150,14 +130,3 @@ def patent_deep_reflection_by_openai(state: DeepSearchState)  -> ReflectionState
         "research_loop_count": state.research_loop_count + 1,
         "patent_search_query": ' '.join(result.follow_up_queries),
     }
-
-
-def continue_to_patent_research(state: QueryGenerationState):
-    """LangGraph node that sends the search queries to the patent research agent.
-
-    This is used to spawn n number of patent research nodes, one for each search query.
-    """
-    return [
-        Send("patent_research", {"search_query": search_query, "id": int(idx)})
-        for idx, search_query in enumerate(state["search_query"])
-    ]
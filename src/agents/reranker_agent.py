@@ -1,22 +1,32 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
 import os
-import time
 from dotenv import load_dotenv
-from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
+
+from pydantic import BaseModel, Field
+from typing import List
 
 from src.agents.state import DeepSearchState
+from src.utils.llm_provider import invoke_text, invoke_structured
 
 load_dotenv()
 
-import google.generativeai as genai
+rerank_batch_size = int(os.getenv('RERANK_BATCH_SIZE', 0))
+
+
+class DocumentScore(BaseModel):
+    id: str = Field(
+        description="The id of the document as given in the input."
+    )
+    score: int = Field(
+        description="The relevance score of the document from 0 to 5."
+    )
 
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-openai_model = os.getenv('OPENAI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
+
+class DocumentScoreList(BaseModel):
+    scores: List[DocumentScore] = Field(
+        description="One relevance score for every provided document."
+    )
 
 
 def patent_reranker(topic:str, doc:str, model:str):
@@ -62,17 +72,8 @@ def rerank_by_gemini(topic: str, doc: str):
         Document: '''{doc}''' \n
         Score:
         """
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(rerank_prompt_template,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.2,
-                                          top_k=2,
-                                          temperature=0.0)
-                                      )
-    time.sleep(5)
-    return response.text.strip()
+    response = invoke_text('gemini', rerank_prompt_template, temperature=0.0, top_p=0.2, top_k=2)
+    return response.strip()
 
 
 def rerank_by_openai(topic: str, doc: str):
@@ -103,22 +104,102 @@ def rerank_by_openai(topic: str, doc: str):
         Document: '''{doc}''' \n
         Score:
         """
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.1,
-    )
-
-    prompt = PromptTemplate(
-        input_variables=["topic", "doc"],
-        template=rerank_prompt_template,
-    )
-    # Create chain
-    chain = prompt | llm_model | StrOutputParser()
-    score = chain.invoke({"topic": topic, "document": doc})
+    score = invoke_text('gpt', rerank_prompt_template, temperature=0.1)
 
     return score
 
 
+def patent_batch_reranker(topic: str, docs: List[str], model: str, batch_size: int = rerank_batch_size):
+    """
+    Apply the re-ranker agent listwise: score `batch_size` documents per LLM call.
+    Documents missing from the answer are scored one by one with `patent_reranker`.
+    :param topic:
+    :param docs:
+    :param model:
+    :param batch_size:
+    :return: list of relevance scores (as strings) in the order of `docs`
+    """
+    batch_size = max(1, batch_size)
+    scores = []
+    for start in range(0, len(docs), batch_size):
+        batch = {f"D{idx}": doc for idx, doc in enumerate(docs[start:start + batch_size])}
+        if 'gpt' in model:
+            batch_scores = batch_rerank_by_openai(topic, batch)
+        else:
+            batch_scores = batch_rerank_by_gemini(topic, batch)
+        for doc_id, doc in batch.items():
+            if doc_id in batch_scores:
+                scores.append(batch_scores[doc_id])
+            else:
+                scores.append(patent_reranker(topic, doc, model))
+
+    return scores
+
+
+def create_batch_rerank_prompt(topic: str, docs: dict):
+    documents = "\n".join(f"[{doc_id}] '''{doc}'''" for doc_id, doc in docs.items())
+    batch_rerank_prompt_template = f"""
+        You are an assistant whose role is to evaluate how relevant given patent documents or passages are to a specified topic.
+        You will be provided with a Topic and a list of Patent Documents/passages, each one preceded by its id in brackets.\n
+        Your task is to assign to every document a relevance score from 0 to 5, and below is your grading rubric:
+             0 = not relevant at all.
+             5 = highly relevant. \n
+
+        - Your relevance score should reflect whether the document addresses the entire topic.
+        For example, if the topic is “cold plasma for skin treatment”, the document must relate to both “cold plasma” and “skin treatment” in order to be considered relevant.
+
+        Instructions:
+            - Read the topic and every patent document carefully.
+            - Score every document independently of the other documents.
+            - Determine how clearly the document relates to the given topic.
+            - Do not make assumptions beyond the provided text.
+            - Return one score for every document id.
+
+        Topic:  '''{topic}'''\n
+        Documents:
+        {documents}
+        """
+    return batch_rerank_prompt_template
+
+
+def parse_batch_scores(result: DocumentScoreList, docs: dict):
+    """Keep only the scores of known ids, clamped to the 0-5 rubric."""
+    scores = {}
+    if result is None:
+        return scores
+    for entry in result.scores:
+        doc_id = entry.id.strip().strip("[]")
+        if doc_id in docs:
+            scores[doc_id] = str(min(5, max(0, entry.score)))
+    return scores
+
+
+def batch_rerank_by_gemini(topic: str, docs: dict):
+    """
+    Use Gemini model for listwise re-ranking
+    :param topic:
+    :param docs: documents keyed by their id
+    :return: relevance scores keyed by document id
+    """
+    batch_rerank_prompt_template = create_batch_rerank_prompt(topic, docs)
+    result = invoke_structured('gemini', batch_rerank_prompt_template, DocumentScoreList, temperature=0.0)
+
+    return parse_batch_scores(result, docs)
+
+
+def batch_rerank_by_openai(topic: str, docs: dict):
+    """
+    Use GPT model for listwise re-ranking
+    :param topic:
+    :param docs: documents keyed by their id
+    :return: relevance scores keyed by document id
+    """
+    batch_rerank_prompt_template = create_batch_rerank_prompt(topic, docs)
+    result = invoke_structured('gpt', batch_rerank_prompt_template, DocumentScoreList, temperature=0.1)
+
+    return parse_batch_scores(result, docs)
+
+
 if __name__ == "__main__":
     topic = "Cold Plasma for Hair Loss, Hair-Dye and Hair Removal"
     patent_text = "The invention is in the technical field of hair removal equipment, specifically using helium gas. The objective is to provide an improved epilation device that overcomes the limitations of existing methods like laser and photoepilation, which are ineffective on certain hair types or hair growth stages, by creating an athermic plasma plume of helium gas. This equipment is designed for permanent hair removal, regardless of hair color or growth stage. The core of the invention is an epilation equipment comprising an arc flash generator, an applicator handle, and a mechanical valve, configured to modulate helium gas flow to generate an athermic plasma plume via the arc generator."
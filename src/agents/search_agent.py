@@ -1,22 +1,26 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
-import json
 import re
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 from langchain_core.messages import HumanMessage
 
-from src.agents.reranker_agent import rerank_by_gemini, patent_reranker
-from src.agents.state import DeepSearchState
+from src.agents.reranker_agent import rerank_by_gemini, patent_reranker, patent_batch_reranker, rerank_batch_size
+from src.agents.state import DeepSearchState, follow_up_queries
 
-from src.agents.summarization_agent import article_summary_agent_by_gemini, patent_summary_agent
+from src.agents.summarization_agent import article_summary_agent_by_gemini, stored_patent_summary_agent, \
+    stored_patent_summary_and_score_agent
 from src.retrieval.arxiv_retrieval import get_articles
-from src.retrieval.patent_retrieval import search_patent_doc, search_patent_passage
+from src.retrieval.patent_retrieval import iter_patent_docs, iter_patent_passages, search_patent_passage_many, \
+    load_patent_docs
+from src.utils.document_store import DOCUMENT_STORE_ENABLED
 
-from src.utils.utils import patent_search_results_to_str, patent_format_sources, article_search_results_to_str, \
-    article_format_sources, passage_format_sources
+from src.utils.lexical_scorer import lexical_prefilter
+from src.utils.utils import patent_search_results_to_str, article_search_results_to_str, article_format_sources, \
+    passage_format_sources
 
 gemini_api_key = os.getenv('GOOGLE_API_KEY')
 gemini_model = os.getenv('GEMINI_API_MODEL')
@@ -24,13 +28,74 @@ os.environ["GOOGLE_API_KEY"] = gemini_api_key
 
 vespa_doc_schema_name = os.getenv('VESPA_DOC_SCHEMA_NAME')
 vespa_passage_schema_name = os.getenv('VESPA_PASSAGE_SCHEMA_NAME')
+search_concurrency = int(os.getenv('SEARCH_CONCURRENCY', 4))
+# first-stage scorer run before any summary is generated: "lexical", "llm" or "" (off)
+cascade_mode = os.getenv('CASCADE_MODE', '')
+cascade_min_score = float(os.getenv('CASCADE_MIN_SCORE', 0.2))
+cascade_min_llm_score = int(os.getenv('CASCADE_MIN_LLM_SCORE', 2))
+cascade_min_keep = int(os.getenv('CASCADE_MIN_KEEP', 3))
+# one structured LLM call returns both the summary and the relevance score of a hit
+fused_summary_score = os.getenv('FUSED_SUMMARY_SCORE', 'false').lower() in ('1', 'true', 'yes')
+
+
+def map_hits(func, hits, max_workers: int):
+    """
+    Apply `func` to every hit with a bounded thread pool, keeping the hit order.
+    The LLM calls inside `func` share the per-provider rate limiter.
+    :param func:
+    :param hits:
+    :param max_workers: pool width, 1 processes the hits sequentially
+    :return:
+    """
+    if max_workers <= 1 or len(hits) <= 1:
+        return [func(hit) for hit in hits]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(hits))) as executor:
+        return list(executor.map(func, hits))
+
+
+def is_relevant(relevance_score: str):
+    return relevance_score.isdigit() and int(relevance_score) > 2
+
+
+def llm_calls_per_hit(cascade: str, fused: bool, batch_size: int):
+    """LLM calls the patent pipeline spends on a hit that passes the cascade, batch re-ranking counted per hit."""
+    calls = 1 if cascade == "llm" else 0
+    if fused:
+        return calls + 1
+    return calls + 1 + (1 / batch_size if batch_size > 0 else 1)
+
+
+def cascade_prefilter(search_query: str, hits, cascade: str, model: str, max_workers: int):
+    """
+    Cheap first stage of the rerank-before-summarize cascade, scored on title and abstract only.
+    :param search_query:
+    :param hits: PatentHit records
+    :param cascade: "lexical" (local BM25 features) or "llm" (re-ranker on title + abstract)
+    :param model:
+    :param max_workers:
+    :return: the surviving hits in their original order
+    """
+    first_stage_docs = [entry.title + " " + entry.abstract for entry in hits]
+    if cascade == "llm":
+        scores = map_hits(lambda doc: patent_reranker(topic=search_query, doc=doc, model=model),
+                          first_stage_docs, max_workers)
+        return [hit for hit, score in zip(hits, scores)
+                if not score.isdigit() or int(score) >= cascade_min_llm_score]
+
+    kept = lexical_prefilter(search_query, first_stage_docs, min_score=cascade_min_score, min_keep=cascade_min_keep)
+    return [hits[idx] for idx in kept]
 
 
 def patent_search_agent(
         search_query: str,
         schema_name: str,
         hits: int,
-        model: str = 'gemini'):
+        model: str = 'gemini',
+        max_workers: int = search_concurrency,
+        batch_size: int = rerank_batch_size,
+        cascade: str = cascade_mode,
+        fused: bool = fused_summary_score,
+        seen: dict = None):
     """Retrieves the patent documents for a research topic.
 
     Args:
@@ -38,36 +103,74 @@ def patent_search_agent(
         schema_name (str): The vespa index schema
         hits (int): number of hits to return
         :param model:
+        :param max_workers: number of hits summarized and re-ranked in parallel
+        :param batch_size: if > 0, re-rank the summaries listwise with this many documents per LLM call
+        :param cascade: "lexical" or "llm" drops low-scoring hits before they are summarized
+        :param fused: summarize and score every hit in a single LLM call
+        :param seen: patent number -> relevance score of the patents processed by earlier research loops,
+                     they are skipped without any LLM call
     """
-    search_response = search_patent_doc(query=search_query, schema_name=schema_name, hits=hits)
-    search_response = json.loads(search_response)
-
-    response = []
-    for entry in search_response["data"]:
-        pn = entry.get("Patent No", "")
-        title = entry.get("Title", "")
-        abstract = entry.get("Abstract", "")
-        description = entry.get("Description", "")
-        claims = entry.get("Claims", "")
-
+    # the report graph runs one search branch per follow-up query (see continue_to_patent_research)
+    search_hits = list(iter_patent_docs(query=search_query, schema_name=schema_name, hits=hits,
+                                        lazy=DOCUMENT_STORE_ENABLED))
+
+    new_hits = [hit for hit in search_hits if hit.patent_no not in seen] if seen else search_hits
+    skipped = len(search_hits) - len(new_hits)
+    search_hits = new_hits
+
+    summaries_avoided = 0
+    if cascade:
+        survivors = cascade_prefilter(search_query, search_hits, cascade, model, max_workers)
+        summaries_avoided = len(search_hits) - len(survivors)
+        search_hits = survivors
+    # the cascade only needs title and abstract, the full texts are loaded for the surviving hits
+    search_hits = load_patent_docs(search_hits, schema_name, query=search_query)
+
+    def summarize(entry):
         # doc_relevant_score = rerank(topic=research_topic, doc=title+" "+abstract)
-        doc_summary = patent_summary_agent(title, abstract, description, claims, model)
-        doc = {"patent number": pn, "title": title, "summary": doc_summary}
+        doc_summary = stored_patent_summary_agent(entry.patent_no, entry.title, entry.abstract, entry.description,
+                                                  entry.claims, model)
+        return {"patent number": entry.patent_no, "title": entry.title, "summary": doc_summary}
 
+    def summarize_and_rerank(entry):
+        doc = summarize(entry)
         # re-rank the summary with the topic, and store only the relevant ones
-        relevance_score = patent_reranker(topic=search_query, doc=title + " " + doc_summary, model=model)
-        if relevance_score.isdigit():
-            if int(relevance_score) > 2:
-                response.append(doc)
-
-    return {"retrieved_patents": response}
+        relevance_score = patent_reranker(topic=search_query, doc=doc["title"] + " " + doc["summary"], model=model)
+        return doc, relevance_score
+
+    def summarize_and_score(entry):
+        doc_summary, relevance_score = stored_patent_summary_and_score_agent(
+            entry.patent_no, entry.title, entry.abstract, entry.description, entry.claims, search_query, model)
+        return {"patent number": entry.patent_no, "title": entry.title, "summary": doc_summary}, relevance_score
+
+    if fused:
+        scored = map_hits(summarize_and_score, search_hits, max_workers)
+    elif batch_size > 0:
+        docs = map_hits(summarize, search_hits, max_workers)
+        scores = patent_batch_reranker(topic=search_query,
+                                       docs=[doc["title"] + " " + doc["summary"] for doc in docs],
+                                       model=model,
+                                       batch_size=batch_size)
+        scored = list(zip(docs, scores))
+    else:
+        scored = map_hits(summarize_and_rerank, search_hits, max_workers)
+    response = [doc for doc, score in scored if is_relevant(score)]
+
+    return {"retrieved_patents": response,
+            "summaries_avoided": summaries_avoided,
+            "patent_scores": {doc["patent number"]: score for doc, score in scored},
+            "skipped_patents": skipped,
+            "llm_calls_saved": llm_calls_per_hit(cascade, fused, batch_size) * skipped}
 
 
 def patent_passage_search_agent(
         search_query: str,
         schema_name: str,
         hits: int,
-        model: str = 'gemini'):
+        model: str = 'gemini',
+        max_workers: int = search_concurrency,
+        batch_size: int = rerank_batch_size,
+        search_queries: list = None):
     """Retrieves the patent documents for a research topic.
 
     Args:
@@ -75,48 +178,51 @@ def patent_passage_search_agent(
         schema_name (str): The vespa index schema
         hits (int): number of hits to return
         :param model:
+        :param max_workers: number of passages re-ranked in parallel
+        :param batch_size: if > 0, re-rank the passages listwise with this many passages per LLM call
+        :param search_queries: if several, they are searched concurrently and their hits merged with RRF
     """
-    search_response = search_patent_passage(query=search_query, schema_name=schema_name, hits=hits)
-    search_response = json.loads(search_response)
-
-    response = []
-    for entry in search_response["data"]:
-        pn = entry.get("Patent No", "")
-        passage = entry.get("PASSAGE", "")
-
-        doc = {"patent number": pn, "summary": passage}
-
-        # re-rank the summary with the topic, and store only the relevant ones
-        relevance_score = patent_reranker(topic=search_query, doc=passage, model=model)
-        if relevance_score.isdigit():
-            if int(relevance_score) > 2:
-                response.append(doc)
+    if search_queries and len(search_queries) > 1:
+        search_hits = search_patent_passage_many(queries=search_queries, schema_name=schema_name, hits=hits)
+    else:
+        search_hits = iter_patent_passages(query=search_query, schema_name=schema_name, hits=hits)
+
+    docs = [{"patent number": entry.patent_no, "summary": entry.passage} for entry in search_hits]
+
+    # re-rank the passages with the topic, and store only the relevant ones
+    if batch_size > 0:
+        scores = patent_batch_reranker(topic=search_query, docs=[doc["summary"] for doc in docs],
+                                       model=model, batch_size=batch_size)
+    else:
+        scores = map_hits(lambda doc: patent_reranker(topic=search_query, doc=doc["summary"], model=model),
+                          docs, max_workers)
+    response = [doc for doc, score in zip(docs, scores) if is_relevant(score)]
 
     return {"retrieved_patents": response}
 
 
 def article_search_agent(
         research_topic: str,
-        hits: int):
+        hits: int,
+        max_workers: int = search_concurrency):
     """Retrieves the paper documents for a research topic.
 
     Args:
         research_topic (str):
         hits (int): number of hits to return
+        :param max_workers: number of articles summarized in parallel
     """
     # query = query_agent_by_gemini(research_topic, "paper")
     # query =  re.sub('[^a-zA-Z]', ' ', query)
     # print("Research_topic: "+ research_topic, " Query: "+ query)
     search_response = get_articles(research_topic, topn=hits)
-    response = []
-    for entry in search_response["retrieved_papers"]:
-        url = entry.get("url", "")
+
+    def summarize(entry):
         title = entry.get("Title", "")
-        abstract = entry.get("Abstract", "")
-        doc_summary = article_summary_agent_by_gemini(title, abstract, None)
-        doc = {"url": url, "title": title, "summary": doc_summary}
+        doc_summary = article_summary_agent_by_gemini(title, entry.get("Abstract", ""), None)
+        return {"url": entry.get("url", ""), "title": title, "summary": doc_summary}
 
-        response.append(doc)
+    response = map_hits(summarize, search_response["retrieved_papers"], max_workers)
 
     return {"retrieved_articles": response}
 
@@ -125,11 +231,20 @@ def patent_search(state: DeepSearchState):
     topic = [msg.content for msg in state.research_topic if isinstance(msg, HumanMessage)][0]
     search_query = state.patent_search_query
     #print(" Q: ## "+ search_query)
-    research_results = patent_search_agent(search_query=search_query, schema_name= vespa_doc_schema_name, hits=20)
-    research_results_str = patent_search_results_to_str(research_results)
-
-    return {"patent_sources_gathered": [patent_format_sources(research_results)],
-            "patent_research_results": [research_results_str]}
+    research_results = patent_search_agent(search_query=search_query, schema_name= vespa_doc_schema_name, hits=20,
+                                           seen=state.seen_patents)
+    patents = research_results["retrieved_patents"]
+    llm_calls_saved = {"loop": state.research_loop_count, "query": search_query,
+                       "skipped_patents": research_results["skipped_patents"],
+                       "llm_calls_saved": round(research_results["llm_calls_saved"])}
+
+    # one entry per patent, so the state reducer drops the patents already gathered
+    return {"patent_sources_gathered": [{"patent number": doc["patent number"], "title": doc["title"]}
+                                        for doc in patents],
+            "patent_research_results": patents,
+            "summaries_avoided": research_results["summaries_avoided"],
+            "seen_patents": research_results["patent_scores"],
+            "llm_calls_saved": [llm_calls_saved]}
 
 
 def article_research(state: DeepSearchState):
@@ -141,7 +256,8 @@ def article_research(state: DeepSearchState):
 
 
 def patent_passage_search(state: DeepSearchState):
-    research_results = patent_passage_search_agent(search_query=state.patent_search_query, schema_name= vespa_passage_schema_name, hits=20)
+    research_results = patent_passage_search_agent(search_query=state.patent_search_query, schema_name= vespa_passage_schema_name, hits=20,
+                                                   search_queries=follow_up_queries(state))
     research_results_str = patent_search_results_to_str(research_results)
 
     return {"patent_sources_gathered": [passage_format_sources(research_results)],
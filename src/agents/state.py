@@ -6,12 +6,30 @@ from typing_extensions import Annotated
 from typing import TypedDict, List
 from pydantic import Field
 
+
+def add_new_patents(left: list, right: list):
+    """
+    Reducer of the gathered patents: the entries of patents already gathered, by an earlier loop or a
+    concurrent search branch, are dropped. Entries are dicts with a "patent number"; other entries are
+    appended as they are.
+    """
+    seen = {entry.get("patent number") for entry in left if isinstance(entry, dict)}
+    merged = list(left)
+    for entry in right:
+        if isinstance(entry, dict):
+            if entry.get("patent number") in seen:
+                continue
+            seen.add(entry.get("patent number"))
+        merged.append(entry)
+    return merged
+
+
 @dataclass(kw_only=True)
 class DeepSearchState():
     research_topic: str = field(default=None)
     patent_search_query: str = field(default=None)
-    patent_research_results: Annotated[list, operator.add] = field(default_factory=list)
-    patent_sources_gathered: Annotated[list, operator.add] = field(default_factory=list)
+    patent_research_results: Annotated[list, add_new_patents] = field(default_factory=list)
+    patent_sources_gathered: Annotated[list, add_new_patents] = field(default_factory=list)
     research_loop_count: int = field(default=0)
     max_research_loops: int = field(default=1)
     patent_running_summary: str = field(default=None)
@@ -23,6 +41,18 @@ class DeepSearchState():
     answer: str = field(default=None)
     answer_sources:str = field(default=None)
     research_task: str = field(default='report')
+    summaries_avoided: Annotated[int, operator.add] = field(default=0)
+    # patent number -> relevance score of every patent summarized so far, later loops skip them
+    seen_patents: Annotated[dict, operator.or_] = field(default_factory=dict)
+    # one {"loop", "query", "skipped_patents", "llm_calls_saved"} entry per patent search
+    llm_calls_saved: Annotated[list, operator.add] = field(default_factory=list)
+
+
+def follow_up_queries(state: DeepSearchState):
+    """The separate follow-up queries of the last reflection, None before the first reflection."""
+    if isinstance(state.follow_up_query, list):
+        return [query for query in state.follow_up_query if query and query.strip()]
+    return None
 
 
 @dataclass(kw_only=True)
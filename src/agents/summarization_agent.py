@@ -1,28 +1,61 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
 
-import os
-import time
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-
+from pydantic import BaseModel, Field
 
+from src.agents.reranker_agent import patent_reranker
 from src.agents.state import DeepSearchState
+from src.utils.llm_provider import invoke_text, invoke_structured, model_name
+from src.utils.summary_store import get_summary_store
 
 load_dotenv()
 
-import openai
+# bump whenever the patent summary prompts change, stored summaries of older prompts are ignored
+PATENT_SUMMARY_PROMPT_VERSION = "v1"
+PATENT_SUMMARY_SCORE_PROMPT_VERSION = "fused-v1"
 
 
-import google.generativeai as genai
+class PatentSummaryScore(BaseModel):
+    summary: str = Field(
+        description="The concise summary of the patent document."
+    )
+    relevance_score: int = Field(
+        description="The relevance score of the patent document to the topic from 0 to 5."
+    )
 
-gemini_api_key = os.getenv('GOOGLE_API_KEY')
-gemini_model = os.getenv('GEMINI_API_MODEL')
-os.environ["GOOGLE_API_KEY"] = gemini_api_key
 
-openai.api_key = os.getenv('OPENAI_API_KEY')
-openai_model = os.getenv('OPENAI_API_MODEL')
+def summary_model_name(model: str):
+    return model_name(model)
+
+
+def stored_patent_summary_agent(pn: str,
+                                ti: str,
+                                ab: str,
+                                detd: str,
+                                clms: str,
+                                model: str,
+                                store=None):
+    """
+    Summarize the patent document once, later calls read the summary store
+    :param pn: patent number
+    :param ti:
+    :param ab:
+    :param detd:
+    :param clms:
+    :param model:
+    :param store: PatentSummaryStore, the process-wide store by default
+    :return:
+    """
+    store = store or get_summary_store()
+    model_name = summary_model_name(model)
+    summary = store.get(pn, model_name, PATENT_SUMMARY_PROMPT_VERSION) if pn else None
+    if summary is None:
+        summary = patent_summary_agent(ti, ab, detd, clms, model)
+        if pn and summary:
+            store.put(pn, model_name, PATENT_SUMMARY_PROMPT_VERSION, summary)
+
+    return summary
 
 
 def patent_summary_agent(ti: str,
@@ -69,18 +102,9 @@ def patent_summary_agent_by_openai(ti: str,
         context:  '''{context}'''\n
         CONCISE SUMMARY:
         """
-    prompt_template = PromptTemplate(
-        input_variables=["research_topic"],
-        template=summary_prompt_template
-    )
-    llm_model = ChatOpenAI(
-        model_name=openai_model,
-        temperature=0.1,
-    )
-    summary_chain = prompt_template | llm_model
-    result = summary_chain.invoke({"content": context})
+    result = invoke_text('gpt', summary_prompt_template, temperature=0.1)
 
-    return result.content.replace('\n', '')
+    return result.replace('\n', '')
 
 
 def patent_summary_agent_by_gemini(ti: str,
@@ -122,18 +146,129 @@ def patent_summary_agent_by_gemini(ti: str,
         Claims: '''{clms}''' \n
         CONCISE SUMMARY:
         """
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(summary_prompt_template,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.6,
-                                          top_k=5,
-                                          temperature=0.2)
-                                      )
-    time.sleep(5)
+    response = invoke_text('gemini', summary_prompt_template, temperature=0.2, top_p=0.6, top_k=5)
+
+    return response
+
+
+def stored_patent_summary_and_score_agent(pn: str,
+                                          ti: str,
+                                          ab: str,
+                                          detd: str,
+                                          clms: str,
+                                          topic: str,
+                                          model: str,
+                                          store=None):
+    """
+    Summarize and score the patent document in one LLM call. A stored summary, of the fused or of the
+    summary-only prompt (e.g. pre-warmed), is re-used, then only the topic-dependent score is requested.
+    :return: summary, relevance score (as string)
+    """
+    store = store or get_summary_store()
+    model_name = summary_model_name(model)
+    summary = None
+    if pn:
+        for prompt_version in (PATENT_SUMMARY_SCORE_PROMPT_VERSION, PATENT_SUMMARY_PROMPT_VERSION):
+            summary = store.get(pn, model_name, prompt_version)
+            if summary is not None:
+                break
+    if summary is not None:
+        return summary, patent_reranker(topic=topic, doc=ti + " " + summary, model=model)
+
+    summary, relevance_score = patent_summary_and_score_agent(ti, ab, detd, clms, topic, model)
+    if pn and summary:
+        store.put(pn, model_name, PATENT_SUMMARY_SCORE_PROMPT_VERSION, summary)
+
+    return summary, relevance_score
+
+
+def patent_summary_and_score_agent(ti: str,
+                                   ab: str,
+                                   detd: str,
+                                   clms: str,
+                                   topic: str,
+                                   model: str):
+    if 'gpt' in model:
+        return patent_summary_and_score_by_openai(ti, ab, detd, clms, topic)
+    elif 'gemini' in model:
+        return patent_summary_and_score_by_gemini(ti, ab, detd, clms, topic)
+
+
+def create_summary_and_score_prompt(ti: str, ab: str, detd: str, clms: str, topic: str):
+    summary_score_prompt_template = f"""You will be provided with a Topic and with Title, Abstract, Description, and Claims of a patent document.\n
+        Your first task is, from only the provided patent texts, to write a concise summary which includes: \n
+            - the technical field or area of the invention, \n
+            - the objectives of the invention,\n
+            - the uses or applications of the invention, and,\n
+            - the core of the invention or the novelty extracted from the first sentence of the claims.\n
+            - the summary of the abstract, technical effects, technical problems, and technical means.\n
+        The summary must describe the patent only and must not depend on the topic.\n
+
+        Your second task is to assign a relevance score of the patent document to the topic from 0 to 5:
+             0 = not relevant at all.
+             5 = highly relevant. \n
+        - Your relevance score should reflect whether the document addresses the entire topic.
+        For example, if the topic is “cold plasma for skin treatment”, the document must relate to both “cold plasma” and “skin treatment” in order to be considered relevant.
+
+        Instructions:
+            - Keep the summary concise.
+            - Do not hallucinate.
+            - Do not include any irrelevant information.
+            - Do not make assumptions beyond the provided text.
+
+        Topic:  '''{topic}'''\n
+        Title:  '''{ti}'''\n
+        Abstract: '''{ab}''' \n
+        Description: '''{detd}'''\n
+        Claims: '''{clms}''' \n
+        """
+    return summary_score_prompt_template
+
+
+def parse_summary_score(result: PatentSummaryScore):
+    if result is None:
+        return "", ""
+    return result.summary, str(min(5, max(0, result.relevance_score)))
+
+
+def patent_summary_and_score_by_gemini(ti: str,
+                                       ab: str,
+                                       detd: str,
+                                       clms: str,
+                                       topic: str):
+    """
+    Summarize patent and score its relevance to the topic by Gemini model
+    :param ti:
+    :param ab:
+    :param detd:
+    :param clms:
+    :param topic:
+    :return: summary, relevance score
+    """
+    summary_score_prompt_template = create_summary_and_score_prompt(ti, ab, detd, clms, topic)
+    result = invoke_structured('gemini', summary_score_prompt_template, PatentSummaryScore, temperature=0.0)
+
+    return parse_summary_score(result)
+
+
+def patent_summary_and_score_by_openai(ti: str,
+                                       ab: str,
+                                       detd: str,
+                                       clms: str,
+                                       topic: str):
+    """
+    Summarize patent and score its relevance to the topic by GPT model
+    :param ti:
+    :param ab:
+    :param detd:
+    :param clms:
+    :param topic:
+    :return: summary, relevance score
+    """
+    summary_score_prompt_template = create_summary_and_score_prompt(ti, ab, detd, clms, topic)
+    result = invoke_structured('gpt', summary_score_prompt_template, PatentSummaryScore, temperature=0.1)
 
-    return response.text
+    return parse_summary_score(result)
 
 
 def article_summary_agent_by_gemini(ti: str,
@@ -168,18 +303,9 @@ def article_summary_agent_by_gemini(ti: str,
         
         CONCISE SUMMARY:
         """
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(summary_prompt_template,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.4,
-                                          top_k=4,
-                                          temperature=0.2)
-                                      )
-    time.sleep(5)
+    response = invoke_text('gemini', summary_prompt_template, temperature=0.2, top_p=0.4, top_k=4)
 
-    return response.text
+    return response
 
 
 def summarize_patent_summary(state: DeepSearchState):
@@ -213,16 +339,7 @@ def summarize_patent_summary(state: DeepSearchState):
             f"Create accurate Summary using the Context on this topic: \n <User Input> \n {topic} \n <User Input>\n\n"
         )
 
-    model = genai.GenerativeModel(gemini_model,
-                                  )
-    response = model.generate_content(human_message_content,
-                                      generation_config=genai.types.GenerationConfig(
-                                          candidate_count=1,
-                                          top_p=0.5,
-                                          top_k=5,
-                                          temperature=0.1)
-                                      )
-    running_summary = response.text
+    running_summary = invoke_text('gemini', human_message_content, temperature=0.1, top_p=0.5, top_k=5)
 
     return {"running_summary": running_summary}
 
@@ -0,0 +1,70 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from src.agents.summarization_agent import stored_patent_summary_agent, summary_model_name, \
+    PATENT_SUMMARY_PROMPT_VERSION
+from src.retrieval.patent_retrieval import get_patent_doc_by_pnk
+from src.utils.summary_store import get_summary_store
+
+load_dotenv()
+
+vespa_doc_schema_name = os.getenv('VESPA_DOC_SCHEMA_NAME')
+
+PNK_PATTERN = re.compile(r'\b[A-Z]{2}\d{4,}[A-Z]\d?\b')
+
+
+def read_pnks(path: str):
+    """
+    Read the patent numbers (with kind code, e.g. US10604422B2) of a PNK list or of a research report
+    :param path:
+    :return: unique patent numbers in order of appearance
+    """
+    with open(path, encoding="utf-8") as f:
+        return list(dict.fromkeys(PNK_PATTERN.findall(f.read())))
+
+
+def prewarm_patent_summaries(pnks,
+                             schema_name: str = vespa_doc_schema_name,
+                             model: str = 'gemini',
+                             max_workers: int = 4):
+    """
+    Summarize every patent of `pnks` that is not yet in the summary store
+    :param pnks: patent numbers
+    :param schema_name: The vespa index schema
+    :param model:
+    :param max_workers: number of patents fetched and summarized in parallel
+    :return: number of new summaries
+    """
+    store = get_summary_store()
+    missing = store.missing(pnks, summary_model_name(model), PATENT_SUMMARY_PROMPT_VERSION)
+
+    def prewarm(pnk):
+        doc = get_patent_doc_by_pnk(pnk, schema_name)
+        if doc is None:
+            print(f"Patent {pnk} not found in {schema_name}")
+            return 0
+        stored_patent_summary_agent(pnk, doc.title, doc.abstract, doc.description, doc.claims,
+                                    model, store=store)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return sum(executor.map(prewarm, missing))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-warm the patent summary store")
+    parser.add_argument("files", nargs="+", help="PNK lists or research reports, e.g. data/*.md")
+    parser.add_argument("--schema", default=vespa_doc_schema_name)
+    parser.add_argument("--model", default="gemini")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    pnks = list(dict.fromkeys(pnk for path in args.files for pnk in read_pnks(path)))
+    created = prewarm_patent_summaries(pnks, args.schema, args.model, args.workers)
+    print(f"{len(pnks)} patents, {created} new summaries, store: {get_summary_store().stats()}")
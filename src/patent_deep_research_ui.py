@@ -7,7 +7,14 @@ import sys
 
 sys.path.append("..")
 
-from src.agents.main import run_deep_research, run_chat_deep_research
+from src.agents.main import run_deep_research, run_chat_deep_research, compile_graphs, new_thread_id, can_resume, \
+    resume_deep_research, resume_chat_deep_research
+from src.utils.llm_provider import warm_up_llm_clients
+
+# build the LLM clients and open their connections once per process
+warm_up_llm_clients()
+# compile the research graphs once, every session runs them with its own thread id
+compile_graphs()
 
 st.set_page_config(page_title="Agentic AI for Deep Research on Patents", page_icon="🐈", layout="wide")
 st.title('Patent Deep Research')
@@ -27,54 +34,87 @@ with st.form(key='columns_in_form'):
 
     search_buttom = st.form_submit_button(label='Search')
 
-if search_buttom and text_query.strip():
-    SYSTEM_PROMPT = """You will act as a patent expert for analysing patents and perform a deep research"""
-    USER_PROMPT = text_query.strip()
-
-    if deep_research_task == "Scientific Report":
-        results = run_deep_research(SYSTEM_PROMPT, USER_PROMPT, model_name)
-        output = results['patent_deep_review']["patent_running_summary"]
-        output_parts = output.split("## Sources:")
-        report = output_parts[0].strip()
-        sources = output_parts[1].strip().replace("\n", "") if len(output_parts) > 1 else ""
-        sources = (sources.replace("[", "").replace("]", "")
-                   .replace("#", "<br>")
-                   .replace("'", ""))
-        sources = f"""  {sources} """
-
-        report = report.replace("```text ", "").replace("```", "").strip().removeprefix("text ").strip()
-        readme_html = markdown.markdown(report)
-        st.markdown(readme_html, unsafe_allow_html=True)
-
-        # st.markdown(report, unsafe_allow_html=True)
-        st.write("\n\n <b> Contexts:</b>\n" + sources.replace('\n', '<br>'), unsafe_allow_html=True)
-        report_und_context = report + "\n\n" + sources
-        # st.code(report_und_context, language="markdown")
-
-        file_name = USER_PROMPT + "_REPORT.md"
-        # Create a download button
-        st.download_button(
-            label="📥 " + file_name,
-            data=report_und_context,
-            file_name=file_name,
-            mime="text/markdown"
-        )
 
-    else:
-        if deep_research_task == "QA":
-            results = run_chat_deep_research(SYSTEM_PROMPT, USER_PROMPT, model_name)
-            output = results['finalize_answer']["answer"]
+def show_report(results, topic: str):
+    output = results['patent_deep_review']["patent_running_summary"]
+    output_parts = output.split("## Sources:")
+    report = output_parts[0].strip()
+    sources = output_parts[1].strip().replace("\n", "") if len(output_parts) > 1 else ""
+    sources = (sources.replace("[", "").replace("]", "")
+               .replace("#", "<br>")
+               .replace("'", ""))
+    sources = f"""  {sources} """
+
+    report = report.replace("```text ", "").replace("```", "").strip().removeprefix("text ").strip()
+    readme_html = markdown.markdown(report)
+    st.markdown(readme_html, unsafe_allow_html=True)
+
+    # st.markdown(report, unsafe_allow_html=True)
+    st.write("\n\n <b> Contexts:</b>\n" + sources.replace('\n', '<br>'), unsafe_allow_html=True)
+    report_und_context = report + "\n\n" + sources
+    # st.code(report_und_context, language="markdown")
+
+    file_name = topic + "_REPORT.md"
+    # Create a download button
+    st.download_button(
+        label="📥 " + file_name,
+        data=report_und_context,
+        file_name=file_name,
+        mime="text/markdown"
+    )
+
+
+def show_answer(results):
+    output = results['finalize_answer']["answer"]
+
+    output_cleaned = output.replace("```json", "").replace("```", "")
+    output_json = json.loads(output_cleaned)
+
+    st.markdown(
+        "\n\n" + f"<div style='max-height:600px; overflow-y:auto;'>\n" + {output_json["answer"]} + "</div>",
+        unsafe_allow_html=True)
+    st.markdown("\n\n <br> <b> Sources:</b> <br> \n" + "<br>".join(output_json["sources"]),
+                unsafe_allow_html=True)
 
-            output_cleaned = output.replace("```json", "").replace("```", "")
-            output_json = json.loads(output_cleaned)
+    # readme_html = markdown.markdown(report)
+
+    # st.markdown(output, unsafe_allow_html=True)
+    # st.write("\n\n <b> Contexts:</b>\n" + sources.replace('\n', '<br>'), unsafe_allow_html=True)
+
+
+def run_session(session: dict, resume: bool = False):
+    """Run, or resume after a failure, the research session kept in st.session_state, and show its output."""
+    report_task = session["task"] == "Scientific Report"
+    try:
+        if resume:
+            results = resume_deep_research(session["thread_id"]) if report_task else \
+                resume_chat_deep_research(session["thread_id"])
+        elif report_task:
+            results = run_deep_research(SYSTEM_PROMPT, session["topic"], session["llm"], thread_id=session["thread_id"])
+        else:
+            results = run_chat_deep_research(SYSTEM_PROMPT, session["topic"], session["llm"],
+                                             thread_id=session["thread_id"])
+    except Exception as e:
+        # the completed nodes are checkpointed under the thread id, a resume continues from there
+        st.session_state["failed_session"] = session
+        st.error(f"The research failed: {e}")
+        return
+
+    if report_task:
+        show_report(results, session["topic"])
+    else:
+        show_answer(results)
 
-            st.markdown(
-                "\n\n" + f"<div style='max-height:600px; overflow-y:auto;'>\n" + {output_json["answer"]} + "</div>",
-                unsafe_allow_html=True)
-            st.markdown("\n\n <br> <b> Sources:</b> <br> \n" + "<br>".join(output_json["sources"]),
-                        unsafe_allow_html=True)
 
-            # readme_html = markdown.markdown(report)
+SYSTEM_PROMPT = """You will act as a patent expert for analysing patents and perform a deep research"""
 
-            # st.markdown(output, unsafe_allow_html=True)
-            # st.write("\n\n <b> Contexts:</b>\n" + sources.replace('\n', '<br>'), unsafe_allow_html=True)
+if search_buttom and text_query.strip():
+    st.session_state.pop("failed_session", None)
+    run_session({"thread_id": new_thread_id(), "task": deep_research_task, "topic": text_query.strip(),
+                 "llm": model_name})
+
+failed_session = st.session_state.get("failed_session")
+if failed_session and can_resume():
+    if st.button("Resume the failed research"):
+        st.session_state.pop("failed_session")
+        run_session(failed_session, resume=True)
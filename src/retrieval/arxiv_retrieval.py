@@ -1,45 +1,68 @@
 # Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
-import re
+import threading
 
 import arxiv
 import os
-import pandas as pd
-import json
 from dotenv import load_dotenv
 
+from src.utils.arxiv_cache import get_arxiv_cache
+
 load_dotenv()
 
+# arXiv asks API users for at most one request every three seconds
+ARXIV_DELAY_SECONDS = float(os.getenv('ARXIV_DELAY_SECONDS', 3.0))
+
+_arxiv_client = None
+_arxiv_client_lock = threading.Lock()
+# one arXiv request at a time per process, whatever the number of research sessions
+_arxiv_request_lock = threading.Lock()
+
+
+def get_arxiv_client():
+    """arxiv.Client shared by all searches, so its request delay applies across sessions."""
+    global _arxiv_client
+    with _arxiv_client_lock:
+        if _arxiv_client is None:
+            _arxiv_client = arxiv.Client(page_size=100,
+                                         delay_seconds=ARXIV_DELAY_SECONDS,
+                                         num_retries=3)
+        return _arxiv_client
+
+
 def get_articles(query: str, topn: int = 20):
     """
-    Extracting the Arxiv articles
+    Extracting the Arxiv articles, served from the local metadata cache when the same search ran before
     :param query:
     :param topn:
     :return:
     """
 
     # query = re.sub('[^a-zA-Z]', ' ', query)
-    client = arxiv.Client(page_size=100,
-                          delay_seconds=3.0,
-                          num_retries=3)
+    cache = get_arxiv_cache()
+    articles = cache.get_articles(query, topn)
+    if articles is not None:
+        return {"retrieved_papers": articles}
+
+    client = get_arxiv_client()
     search = arxiv.Search(
         query=query,
         max_results=topn,
         sort_by=arxiv.SortCriterion.Relevance
     )
-    results = client.results(search)
-    # df = pd.DataFrame(columns=["Article-No", "Title", "Abstract", "Publication-Date", "url"])
     articles = []
-    for article in results:
-        article_id = article.get_short_id()
-        title = article.title
-        abstract = article.summary
-        pub_date = article.published
-        url = article.pdf_url
-        row = {"Article-No": article_id, "Title": title, "Abstract": abstract, "Publication-Date": pub_date, "url": url}
-        # df = df._append(row, ignore_index=True)
-        articles.append(row)
-
-    # response = df.to_json(orient='records')  # '{"news":'+df.to_json(orient='records')+"}"
+    with _arxiv_request_lock:
+        # the result pages are requested lazily while iterating
+        for article in client.results(search):
+            article_id = article.get_short_id()
+            title = article.title
+            abstract = article.summary
+            pub_date = article.published.isoformat() if article.published else ""
+            url = article.pdf_url
+            row = {"Article-No": article_id, "Title": title, "Abstract": abstract, "Publication-Date": pub_date,
+                   "url": url}
+            articles.append(row)
+
+    cache.put_articles(query, topn, articles)
     return {"retrieved_papers": articles}
 
 
@@ -0,0 +1,79 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import hashlib
+import math
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from src.utils.lexical_scorer import tokenize
+
+load_dotenv()
+
+# Query embedder of semantic/hybrid ranking, it must be the model that embedded the indexed vectors:
+# "sentence-transformers" (local CPU model), "hashing" (deterministic, no model, for tests only)
+# or "" (none, only lexical ranking is possible)
+EMBEDDER = os.getenv('EMBEDDER', '')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', 384))
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder of unigrams and bigrams. It needs no model, which makes
+    it the embedder of tests; its vectors mean nothing to an index embedded with a real model.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    def embed(self, text: str):
+        tokens = tokenize(text)
+        features = tokens + [a + "_" + b for a, b in zip(tokens, tokens[1:])]
+        vector = [0.0] * self.dim
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            idx = int.from_bytes(digest[:4], "little") % self.dim
+            vector[idx] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU sentence-transformers model, loaded once per process."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("EMBEDDER=sentence-transformers requires the sentence-transformers package") from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text: str):
+        return self.model.encode(text, normalize_embeddings=True).tolist()
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def embedder_configured():
+    return bool(EMBEDDER)
+
+
+def get_embedder():
+    """Process-wide query embedder selected by EMBEDDER."""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            if not EMBEDDER:
+                raise ValueError("No EMBEDDER configured, set it to the model of the indexed embeddings")
+            if EMBEDDER == "hashing":
+                _embedder = HashingEmbedder()
+            elif EMBEDDER == "sentence-transformers":
+                _embedder = SentenceTransformerEmbedder()
+            else:
+                raise ValueError(f"Unknown EMBEDDER: {EMBEDDER}")
+        return _embedder
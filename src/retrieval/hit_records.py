@@ -0,0 +1,66 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+from dataclasses import dataclass, field
+from typing import Union
+
+
+@dataclass(slots=True)
+class PatentHit:
+    """One hit of the patent document index."""
+    patent_no: str
+    title: str = ""
+    abstract: str = ""
+    description: Union[str, list] = "-"
+    claims: Union[str, list] = "-"
+    publication_date: str = ""
+    relevance: float = field(default=0.0, compare=False)
+
+    @classmethod
+    def from_vespa(cls, child: dict):
+        fields = child.get('fields', {})
+        return cls(patent_no=fields.get('PNK', ''),
+                   title=fields.get('TIEN', ''),
+                   abstract=fields.get('ABEN', ''),
+                   description=fields.get('DETDEN', '-'),
+                   claims=fields.get('CLMEN', '-'),
+                   publication_date=fields.get('PD', ''),
+                   relevance=child.get('relevance', 0.0))
+
+    def to_dict(self):
+        """Record with the column names of the legacy JSON search API."""
+        return {"Patent No": self.patent_no, "Title": self.title, "Abstract": self.abstract,
+                "Description": self.description, "Claims": self.claims, "Publication Date": self.publication_date}
+
+
+@dataclass(slots=True)
+class PassageHit:
+    """One hit of the patent passage index."""
+    passage_id: str
+    patent_no: str = ""
+    passage: str = ""
+    section: str = ""
+    relevance: float = field(default=0.0, compare=False)
+
+    @classmethod
+    def from_vespa(cls, child: dict):
+        fields = child.get('fields', {})
+        return cls(passage_id=fields.get('ID', ''),
+                   patent_no=fields.get('PNK', ''),
+                   passage=fields.get('PASSAGE', ''),
+                   section=fields.get('SECTION', ''),
+                   relevance=child.get('relevance', 0.0))
+
+    def to_dict(self):
+        """Record with the column names of the legacy JSON search API."""
+        return {"Passage ID": self.passage_id, "Patent No": self.patent_no, "PASSAGE": self.passage}
+
+
+def iter_hits(response: dict, record):
+    """
+    Decode the hits of a Vespa search answer into `record` instances in one pass
+    :param response: decoded JSON answer of the search API
+    :param record: PatentHit or PassageHit
+    :return: generator of records, in rank order
+    """
+    for child in response['root'].get('children', []):
+        yield record.from_vespa(child)
@@ -0,0 +1,207 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.retrieval.hit_records import PatentHit, PassageHit
+from src.retrieval.snippets import project_hit
+from src.utils.lexical_scorer import tokenize
+
+load_dotenv()
+
+LOCAL_INDEX_DIR = os.getenv('LOCAL_INDEX_DIR', '.cache/local_index')
+
+# fields indexed for each kind of index, with the Vespa field names of the export
+INDEXED_FIELDS = {
+    "doc": ("TIEN", "ABEN", "DETDEN", "CLMEN"),
+    "passage": ("PASSAGE",),
+}
+
+
+def read_export(path: str):
+    """
+    Records of a JSON export of src/retrieval/postgres_to_json.py: a JSON array, or JSON lines,
+    optionally gzipped. Each record is the Vespa fields either as such, under "fields" or
+    under the exported "data" column.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        if path.endswith((".json", ".json.gz")):
+            records = json.load(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            if "fields" in record:
+                record = record["fields"]
+            elif "data" in record and len(record) == 1:
+                record = record["data"]
+            yield json.loads(record) if isinstance(record, str) else record
+
+
+def _text(value):
+    return " ".join(str(item) for item in value) if isinstance(value, list) else str(value or "")
+
+
+def build_local_index(export_paths, index_dir: str, kind: str = "doc"):
+    """
+    Build an inverted index of the exported records. Postings are stored as flat numpy arrays
+    (document ids and term frequencies, sliced by per-term offsets) and the records as JSON lines
+    addressed by byte offsets, so that LocalIndex can memory-map everything.
+    :param export_paths: JSON/JSONL export files
+    :param index_dir: output directory
+    :param kind: "doc" or "passage"
+    :return: number of indexed records
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    postings = defaultdict(list)
+    doc_lengths = []
+    doc_offsets = [0]
+    representative = []
+    with open(os.path.join(index_dir, "docs.jsonl"), "wb") as docs_file:
+        for path in export_paths:
+            for fields in read_export(path):
+                doc_id = len(doc_lengths)
+                terms = Counter(tokenize(" ".join(_text(fields.get(name)) for name in INDEXED_FIELDS[kind])))
+                for term, tf in terms.items():
+                    postings[term].append((doc_id, tf))
+                doc_lengths.append(sum(terms.values()))
+                representative.append(str(fields.get("RFM", 1)) == "1")
+                line = json.dumps(fields, ensure_ascii=False).encode("utf-8") + b"\n"
+                docs_file.write(line)
+                doc_offsets.append(doc_offsets[-1] + len(line))
+
+    vocabulary = sorted(postings)
+    term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    for idx, term in enumerate(vocabulary):
+        term_offsets[idx + 1] = term_offsets[idx] + len(postings[term])
+    doc_ids = np.empty(term_offsets[-1], dtype=np.uint32)
+    tfs = np.empty(term_offsets[-1], dtype=np.float32)
+    for idx, term in enumerate(vocabulary):
+        entries = np.asarray(postings[term], dtype=np.int64)
+        doc_ids[term_offsets[idx]:term_offsets[idx + 1]] = entries[:, 0]
+        tfs[term_offsets[idx]:term_offsets[idx + 1]] = entries[:, 1]
+
+    np.save(os.path.join(index_dir, "term_offsets.npy"), term_offsets)
+    np.save(os.path.join(index_dir, "doc_ids.npy"), doc_ids)
+    np.save(os.path.join(index_dir, "tfs.npy"), tfs)
+    np.save(os.path.join(index_dir, "doc_lengths.npy"), np.asarray(doc_lengths, dtype=np.float32))
+    np.save(os.path.join(index_dir, "doc_offsets.npy"), np.asarray(doc_offsets, dtype=np.int64))
+    np.save(os.path.join(index_dir, "representative.npy"), np.asarray(representative, dtype=bool))
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump({"kind": kind, "vocabulary": vocabulary}, f)
+
+    return len(doc_lengths)
+
+
+class LocalIndex:
+    """Memory-mapped BM25 index built by build_local_index."""
+
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.kind = meta["kind"]
+        self.term_ids = {term: idx for idx, term in enumerate(meta["vocabulary"])}
+        self.k1 = k1
+        self.b = b
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        self.term_offsets = load("term_offsets.npy")
+        self.doc_ids = load("doc_ids.npy")
+        self.tfs = load("tfs.npy")
+        self.doc_lengths = load("doc_lengths.npy")
+        self.doc_offsets = load("doc_offsets.npy")
+        self.representative = load("representative.npy")
+        self.docs = np.memmap(os.path.join(index_dir, "docs.jsonl"), dtype=np.uint8, mode="r") \
+            if self.doc_offsets[-1] else np.zeros(0, dtype=np.uint8)
+        self.num_docs = len(self.doc_lengths)
+        self.avg_length = float(self.doc_lengths.mean()) if self.num_docs else 1.0
+
+    def search(self, query: str, hits: int = 20, representative_only: bool = False):
+        """
+        BM25 top-k of the documents matching any query term (weakAnd-like OR semantics)
+        :param query:
+        :param hits:
+        :param representative_only: keep only documents with RFM=1, as the Vespa document search does
+        :return: list of (doc id, score), best first
+        """
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = np.zeros(self.num_docs, dtype=bool)
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            doc_ids = self.doc_ids[start:end]
+            tfs = self.tfs[start:end]
+            idf = np.log(1 + (self.num_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_ids] / self.avg_length)
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+            matched[doc_ids] = True
+        if representative_only:
+            matched &= self.representative
+        candidates = np.flatnonzero(matched)
+        if len(candidates) > hits:
+            candidates = candidates[np.argpartition(-scores[candidates], hits - 1)[:hits]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in ranked]
+
+    def document(self, doc_id: int):
+        start, end = self.doc_offsets[doc_id], self.doc_offsets[doc_id + 1]
+        return json.loads(self.docs[start:end].tobytes())
+
+
+_local_indexes = {}
+_local_indexes_lock = threading.Lock()
+
+
+def get_local_index(schema_name: str):
+    """Index of LOCAL_INDEX_DIR/<schema_name>, opened once per process."""
+    with _local_indexes_lock:
+        if schema_name not in _local_indexes:
+            _local_indexes[schema_name] = LocalIndex(os.path.join(LOCAL_INDEX_DIR, schema_name))
+        return _local_indexes[schema_name]
+
+
+def _search(query: str, schema_name: str, rank_function: str, hits: int, representative_only: bool):
+    if rank_function != "lexical":
+        raise ValueError(f"The local retrieval backend only supports rank_function 'lexical', not '{rank_function}'")
+    index = get_local_index(schema_name)
+    # same shape as the children of a Vespa answer, decoded lazily by the callers
+    return ({"fields": index.document(doc_id), "relevance": score}
+            for doc_id, score in index.search(query, hits, representative_only))
+
+
+def iter_local_patent_docs(query: str, schema_name: str, rank_function: str = "lexical", hits: int = 20,
+                           snippets: str = ""):
+    """Local counterpart of patent_retrieval.iter_patent_docs."""
+    hit_records = (PatentHit.from_vespa(child)
+                   for child in _search(query, schema_name, rank_function, hits, representative_only=True))
+    if snippets:
+        return (project_hit(hit, query) for hit in hit_records)
+    return hit_records
+
+
+def iter_local_patent_passages(query: str, schema_name: str, rank_function: str = "lexical", hits: int = 20):
+    """Local counterpart of patent_retrieval.iter_patent_passages."""
+    return (PassageHit.from_vespa(child)
+            for child in _search(query, schema_name, rank_function, hits, representative_only=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local BM25 index of a JSON export")
+    parser.add_argument("exports", nargs="+", help="JSON/JSONL files written by postgres_to_json")
+    parser.add_argument("--schema-name", required=True, help="index name, searched as the Vespa schema name")
+    parser.add_argument("--kind", choices=sorted(INDEXED_FIELDS), default="doc")
+    parser.add_argument("--index-dir", default=LOCAL_INDEX_DIR)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = build_local_index(args.exports, os.path.join(args.index_dir, args.schema_name), args.kind)
+    print(f"Indexed {count} records in {time.perf_counter() - started:.1f}s")
@@ -1,15 +1,30 @@
 # Copyright Mustafa Sofean 2025 - FIZ-Karlsruhe
 
+import asyncio
+import atexit
+import dataclasses
+import io
+import json
 import os
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
-from vespa.application import Vespa
-import pandas as pd
+from urllib3.util.retry import Retry
 
 import xml.etree.ElementTree as ET
-from src.utils.retrieval_utils import extract_values_from_json, get_json_array_value
+from src.retrieval.embedder import get_embedder, embedder_configured
+from src.retrieval.hit_records import PatentHit, PassageHit, iter_hits
+from src.retrieval.local_index import iter_local_patent_docs, iter_local_patent_passages
+from src.retrieval.snippets import SNIPPET_MODE, VESPA_SNIPPET_SUMMARY, project_hit
+from src.utils.document_store import DOCUMENT_STORE_ENABLED, get_document_store
+from src.utils.retrieval_utils import reciprocal_rank_fusion
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,106 +34,396 @@ P4S_SEARCH_API_ENDPOINT = os.getenv('P4S_SEARCH_API_ENDPOINT')
 P4S_SEARCH_API_USER = os.getenv('P4S_SEARCH_API_USER')
 P4S_SEARCH_API_PASSWORD = os.getenv('P4S_SEARCH_API_PASSWORD')
 P4S_SEARCH_API_TOKEN_VALUE = os.getenv('P4S_SEARCH_API_TOKEN_VALUE')
+VESPA_MAX_CONNECTIONS = int(os.getenv('VESPA_MAX_CONNECTIONS', 16))
+VESPA_CONNECT_TIMEOUT = float(os.getenv('VESPA_CONNECT_TIMEOUT', 5))
+VESPA_READ_TIMEOUT = float(os.getenv('VESPA_READ_TIMEOUT', 30))
+VESPA_MAX_RETRIES = int(os.getenv('VESPA_MAX_RETRIES', 3))
+VESPA_DOC_SCHEMA_NAME = os.getenv('VESPA_DOC_SCHEMA_NAME')
+# The existing pt_passage index stores the ID of the pt_doc document in PNK, so passage hits are resolved
+# to patent numbers against the document schema, in batches; values that are no document ID are kept.
+# Passage indexes fed by vespa_feed carry the patent number in PNK and may opt out with RESOLVE_PASSAGE_PNK=false.
+RESOLVE_PASSAGE_PNK = os.getenv('RESOLVE_PASSAGE_PNK', 'true').lower() in ('1', 'true', 'yes')
+PNK_RESOLVER_BATCH_SIZE = int(os.getenv('PNK_RESOLVER_BATCH_SIZE', 200))
+STN_SAPI_TOKEN_TTL = float(os.getenv('STN_SAPI_TOKEN_TTL', 1800))
+STN_SAPI_CONCURRENCY = int(os.getenv('STN_SAPI_CONCURRENCY', 8))
+STN_SAPI_TIMEOUT = float(os.getenv('STN_SAPI_TIMEOUT', 60))
+# fields read from a SAPI document member, the member being at response/documentResponse/document/member
+SAPI_MEMBER_FIELDS = ("PN", "PK", "TIEN", "ABEN", "DETDEN", "MCLMEN", "CLMENINT")
+SAPI_MEMBER_DEPTH = 4
+# "vespa" or "local" (in-process BM25 index built by src/retrieval/local_index.py)
+RETRIEVAL_BACKEND = os.getenv('RETRIEVAL_BACKEND', 'vespa')
+# default rank function of the searches: "lexical", "semantic" or "hybrid"
+RANK_FUNCTION = os.getenv('RANK_FUNCTION', 'lexical')
+# ranking profiles of the Vespa schemas; "semantic" and "hybrid" rank on closeness to query(q)
+RANK_PROFILES = {
+    "lexical": "bm25",
+    "semantic": os.getenv('VESPA_SEMANTIC_PROFILE', 'semantic'),
+    "hybrid": os.getenv('VESPA_HYBRID_PROFILE', 'hybrid'),
+}
+VESPA_EMBEDDING_FIELD = os.getenv('VESPA_EMBEDDING_FIELD', 'embedding')
+VESPA_TARGET_HITS = int(os.getenv('VESPA_TARGET_HITS', 100))
+
+
+class VespaClient:
+    """
+    Keep-alive HTTP client of the Vespa search API. One instance per process is shared by all
+    searches, so the research loops reuse warm connections instead of opening new ones per query.
+    """
 
+    def __init__(self,
+                 url: str,
+                 max_connections: int = VESPA_MAX_CONNECTIONS,
+                 connect_timeout: float = VESPA_CONNECT_TIMEOUT,
+                 read_timeout: float = VESPA_READ_TIMEOUT,
+                 max_retries: int = VESPA_MAX_RETRIES):
+        self.url = url.rstrip('/')
+        self.search_endpoint = self.url + "/search/"
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        # Vespa is reached directly, proxy variables of the environment are ignored
+        self.session.trust_env = False
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=max_connections,
+                              max_retries=Retry(total=max_retries,
+                                                backoff_factor=0.2,
+                                                status_forcelist=(429, 502, 503, 504),
+                                                allowed_methods=None) if max_retries else 0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def query(self, body: dict):
+        """POST a query body to the search API and return the JSON answer."""
+        response = self.session.post(self.search_endpoint, json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, params: dict):
+        """GET the search API with URL parameters and return the JSON answer."""
+        response = self.session.get(self.search_endpoint, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def put_document(self, namespace: str, schema_name: str, doc_id: str, fields: dict):
+        """Write one document through the /document/v1 API."""
+        url = "/".join([self.url, "document/v1", namespace, schema_name, "docid", quote(doc_id, safe="")])
+        response = self.session.post(url, json={"fields": fields}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+_vespa_client = None
+_vespa_client_lock = threading.Lock()
+
+
+def get_vespa_client():
+    global _vespa_client
+    with _vespa_client_lock:
+        if _vespa_client is None:
+            _vespa_client = VespaClient(VESPA_ENDPOINT)
+        return _vespa_client
+
+
+@atexit.register
+def close_vespa_client():
+    """Close the pooled connections, the next search opens a new client."""
+    global _vespa_client
+    with _vespa_client_lock:
+        if _vespa_client is not None:
+            _vespa_client.close()
+            _vespa_client = None
+
+
+def _rank_query(fields: str, schema_name: str, query: str, rank_function: str, hits: int, condition: str = ""):
+    """
+    Vespa query body of a lexical (bm25 + weakAnd), semantic (nearestNeighbor on the query
+    embedding) or hybrid (both, fused by the ranking profile) search
+    """
+    if rank_function not in RANK_PROFILES:
+        raise ValueError(f"Unknown rank_function '{rank_function}', expected one of {list(RANK_PROFILES)}")
+    if rank_function != "lexical" and not embedder_configured():
+        # a query vector of another model than the indexed one would give meaningless neighbours
+        raise ValueError(f"rank_function '{rank_function}' requires EMBEDDER, the model of the indexed embeddings")
+
+    nearest_neighbor = "({targetHits:%d}nearestNeighbor(%s, q))" % (max(hits, VESPA_TARGET_HITS),
+                                                                     VESPA_EMBEDDING_FIELD)
+    where = {"lexical": "userQuery()",
+             "semantic": nearest_neighbor,
+             "hybrid": "(userQuery() or " + nearest_neighbor + ")"}[rank_function]
+    yql = {
+        "yql": "select " + fields + " from " + schema_name + " where " + where + condition,
+        "hits": hits,
+        "ranking": {
+            "profile": RANK_PROFILES[rank_function]
+        }
+    }
+    if rank_function != "semantic":
+        yql["query"] = re.sub('[^a-zA-Z]', ' ', query)
+        yql["type"] = "weakAnd"
+    if rank_function != "lexical":
+        yql["input.query(q)"] = get_embedder().embed(query)
+    return yql
 
 
-def search_patent_passage(query: str, schema_name: str, rank_function: str = "lexical", hits: int = 20):
+def _passage_query(query: str, schema_name: str, rank_function: str, hits: int):
+    return _rank_query("ID, PNK, PASSAGE, SECTION", schema_name, query, rank_function, hits)
+
+
+def _patent_doc_query(query: str, schema_name: str, rank_function: str, hits: int, snippets: str = '',
+                      bodies: bool = True):
+    fields = "ID, PNK,TIEN, ABEN, DETDEN, CLMEN, PD" if bodies else "ID, PNK,TIEN, ABEN, PD"
+    yql = _rank_query(fields, schema_name, query, rank_function, hits, condition=" and RFM=1")
+    if snippets == "vespa":
+        # document summary with dynamic (query-dependent) DETDEN/CLMEN snippets instead of the full texts
+        yql["presentation.summary"] = VESPA_SNIPPET_SUMMARY
+        yql["presentation.bolding"] = False
+    return yql
+
+
+def iter_patent_passages(query: str, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20):
     """
-    search in Vespa engine
+    search the passage index in Vespa engine
+    :param query:
+    :param schema_name:
+    :param rank_function: "lexical", "semantic" or "hybrid"
+    :param hits:
+    :return: generator of PassageHit, in rank order
+    """
+    if RETRIEVAL_BACKEND == "local":
+        return iter_local_patent_passages(query, schema_name, rank_function, hits)
+    results = get_vespa_client().query(_passage_query(query, schema_name, rank_function, hits))
+    if RESOLVE_PASSAGE_PNK:
+        return iter(resolve_passage_pnks(iter_hits(results, PassageHit)))
+    return iter_hits(results, PassageHit)
+
+
+def iter_patent_docs(query: str, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20,
+                     snippets: str = SNIPPET_MODE, lazy: bool = False):
+    """
+    search the document index in Vespa engine
+    :param query:
+    :param schema_name:
+    :param rank_function: "lexical", "semantic" or "hybrid"
+    :param hits:
+    :param snippets: "local" or "vespa" keeps only the query-relevant description sections and the
+        independent claims of every hit, within the DESCRIPTION/CLAIMS_CHAR_BUDGET; "" the full texts
+    :param lazy: leave out the description and claims (None), load_patent_docs fills them in later
+        from the document store; ignored with Vespa snippets, which depend on the query
+    :return: generator of PatentHit, in rank order
+    """
+    if RETRIEVAL_BACKEND == "local":
+        return iter_local_patent_docs(query, schema_name, rank_function, hits, snippets)
+    lazy = lazy and snippets != "vespa"
+    results = get_vespa_client().query(_patent_doc_query(query, schema_name, rank_function, hits, snippets,
+                                                         bodies=not lazy))
+    hit_records = iter_hits(results, PatentHit)
+    if lazy:
+        return (dataclasses.replace(hit, description=None, claims=None) for hit in hit_records)
+    if snippets:
+        return (project_hit(hit, query) for hit in hit_records)
+    return hit_records
+
+
+def search_patent_passage(query: str, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20):
+    """
+    search in Vespa engine, legacy JSON string API on top of iter_patent_passages
     :param query:
     :param rank_function:
     :param hits:
     :return:
     """
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-
-    query = re.sub('[^a-zA-Z]', ' ', query)
-    yql = None
-    vespa_app = Vespa(url=VESPA_ENDPOINT)
-    if rank_function == "lexical":
-        yql = {
-            "yql": "select ID, PNK, PASSAGE, SECTION from " + schema_name + " where userQuery() ",
-            "query": query,
-            "hits": hits,
-            "ranking": {
-                "profile": "bm25"
-            },
-            "type": "weakAnd"
-        }
+    hit_list = iter_patent_passages(query, schema_name, rank_function, hits)
+    return json.dumps({"data": [hit.to_dict() for hit in hit_list]})
 
-    results = vespa_app.query(body=yql)
-    data = results.json['root']['children']
-    id = extract_values_from_json(data, 'ID')
-    pnk = extract_values_from_json(data, 'PNK')
-    passage = extract_values_from_json(data, 'PASSAGE')
 
-    df = pd.DataFrame(list(zip(id, pnk, passage)),
-                      columns=['Passage ID', 'Patent No', 'PASSAGE'])
-    #df['Patent No'] = df['Patent No'].apply(lambda x: get_pnk_by_id(x))
+def search_patent_doc(query: str, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20):
+    """
+    search in Vespa engine, legacy JSON string API on top of iter_patent_docs
+    :param query:
+    :param rank_function:
+    :param hits:
+    :return:
+    """
+    hit_list = iter_patent_docs(query, schema_name, rank_function, hits)
+    return json.dumps({"data": [hit.to_dict() for hit in hit_list]})
+
 
-    df_to_json = df.to_json(orient='records')
-    data = '{"data":' + df_to_json + '}'
+async def _search_many(iterate, queries, key, schema_name: str, rank_function: str, hits: int):
+    """Run one search per query concurrently on the pooled client and merge the rankings with RRF."""
+    def search(query):
+        return list(iterate(query, schema_name, rank_function, hits))
 
-    return data
+    rankings = await asyncio.gather(*(asyncio.to_thread(search, query) for query in queries))
+    return reciprocal_rank_fusion(rankings, key=key, limit=hits)
 
 
-def search_patent_doc(query: str, schema_name: str, rank_function: str = "lexical", hits: int = 20):
+async def asearch_patent_passage_many(queries, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20):
     """
-    search in Vespa engine
-    :param query:
+    Search several queries at once in the passage index, e.g. the follow-up queries of the reflection agent
+    :param queries: list of queries
+    :param schema_name:
     :param rank_function:
-    :param hits:
-    :return:
+    :param hits: number of hits per query and of the merged list
+    :return: list of PassageHit, one per passage
     """
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-
-    query = re.sub('[^a-zA-Z]', ' ', query)
-    yql = None
-    vespa_app = Vespa(url=VESPA_ENDPOINT) #
-    if rank_function == "lexical":
-        yql = {
-            "yql": "select ID, PNK,TIEN, ABEN, DETDEN, CLMEN, PD from " + schema_name + " where userQuery() and RFM=1",
-            "query": query,
-            "hits": hits,
-            "ranking": {
-                "profile": "bm25"
-            },
-            "type": "weakAnd"
-        }
-    results = vespa_app.query(body=yql)
-    data = results.json['root']['children']
-    # ids = extract_values_from_json(data, 'ID')
-    pns = extract_values_from_json(data, 'PNK')
-    tien = extract_values_from_json(data, 'TIEN')
-    aben = extract_values_from_json(data, 'ABEN')
-    patd = extract_values_from_json(data, 'PD')
-    description = get_json_array_value(data, 'DETDEN')
-    claims = get_json_array_value(data, 'CLMEN')
-    df = pd.DataFrame(list(zip(pns, tien, aben, description, claims, patd)),
-                      columns=['Patent No', 'Title', 'Abstract', 'Description', 'Claims', 'Publication Date'])
+    return await _search_many(iter_patent_passages, queries, lambda hit: hit.passage_id,
+                              schema_name, rank_function, hits)
 
-    df_to_json = df.to_json(orient='records')
-    data = '{"data":' + df_to_json + '}'
 
-    return data
+def search_patent_passage_many(queries, schema_name: str, rank_function: str = RANK_FUNCTION, hits: int = 20):
+    """Blocking version of asearch_patent_passage_many, for callers without an event loop."""
+    return asyncio.run(asearch_patent_passage_many(queries, schema_name, rank_function, hits))
 
 
-def get_pnk_by_id(patentID: str):
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-    search_url = VESPA_ENDPOINT+"?query=ID:" + patentID
-    response = requests.get(search_url).json()
-    data = response['root']['children']
-    pnk = ""
+def get_patent_doc_by_pnk(pnk: str, schema_name: str):
+    """
+    Fetch the full text of one patent document by its patent number
+    :param pnk:
+    :param schema_name:
+    :return: PatentHit, None if unknown
+    """
+    store = get_document_store() if DOCUMENT_STORE_ENABLED else None
+    fields = store.get(pnk) if store is not None else None
+    if fields is not None:
+        return PatentHit.from_vespa({"fields": fields})
 
-    for record in data:
-        pnk = record["fields"]["PNK"]
-        return pnk
+    hit = fetch_patent_docs([pnk], schema_name).get(pnk)
+    if hit is not None and store is not None:
+        store.put(pnk, _document_fields(hit))
+    return hit
 
 
-    return
+def _document_fields(hit: PatentHit):
+    return {"PNK": hit.patent_no, "TIEN": hit.title, "ABEN": hit.abstract, "DETDEN": hit.description,
+            "CLMEN": hit.claims, "PD": hit.publication_date}
+
+
+def fetch_patent_docs(pnks, schema_name: str):
+    """
+    Full texts of several patents in one Vespa query
+    :param pnks: patent numbers
+    :param schema_name:
+    :return: dict patent number -> PatentHit, without the unknown ones
+    """
+    if not pnks:
+        return {}
+    params = {f"pnk{idx}": pnk for idx, pnk in enumerate(pnks)}
+    yql = {
+        "yql": "select ID, PNK,TIEN, ABEN, DETDEN, CLMEN, PD from " + schema_name + " where " +
+               " or ".join(f"PNK contains @{name}" for name in params),
+        "hits": len(pnks),
+        **params
+    }
+    results = get_vespa_client().query(yql)
+    return {hit.patent_no: hit for hit in iter_hits(results, PatentHit)}
+
+
+def load_patent_docs(hits, schema_name: str, query: str = None, snippets: str = SNIPPET_MODE):
+    """
+    Fill in the description and claims of lazily searched hits, read through the document store:
+    the bodies not stored yet are fetched from Vespa in a single query and stored.
+    :param hits: PatentHit records, the ones with description None are loaded
+    :param schema_name:
+    :param query: query of the search, for the snippet projection
+    :param snippets: "local" projects the loaded hits like iter_patent_docs does
+    :return: list of PatentHit in the order of `hits`
+    """
+    lazy = [hit.patent_no for hit in hits if hit.description is None]
+    if not lazy:
+        return list(hits)
+
+    store = get_document_store() if DOCUMENT_STORE_ENABLED else None
+    bodies = store.get_many(lazy) if store is not None else {}
+    missing = [pnk for pnk in lazy if pnk not in bodies]
+    if missing:
+        fetched = {pnk: _document_fields(hit) for pnk, hit in fetch_patent_docs(missing, schema_name).items()}
+        if store is not None:
+            store.put_many(fetched)
+        bodies.update(fetched)
+
+    loaded = []
+    for hit in hits:
+        if hit.description is None:
+            body = bodies.get(hit.patent_no, {})
+            hit = dataclasses.replace(hit, description=body.get("DETDEN", "-"), claims=body.get("CLMEN", "-"))
+            if snippets and query:
+                hit = project_hit(hit, query)
+        loaded.append(hit)
+    return loaded
+
+
+class PnkResolver:
+    """
+    Maps document IDs to patent numbers with one `ID in (...)` Vespa query per batch of unknown
+    IDs. The mappings never change and are cached for the process, up to `max_entries`.
+    Only the patent document schema is searched: passages have ID and PNK fields too and would
+    take the hit slots of the documents.
+    """
+
+    def __init__(self, schema_name: str = None, batch_size: int = PNK_RESOLVER_BATCH_SIZE,
+                 max_entries: int = 100000):
+        schema_name = schema_name or VESPA_DOC_SCHEMA_NAME
+        if not schema_name:
+            raise ValueError("Resolving document IDs requires VESPA_DOC_SCHEMA_NAME")
+        self.source = "sources " + schema_name
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.queries = 0
+        self._pnks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve_many(self, ids):
+        """
+        Patent numbers of document IDs
+        :param ids:
+        :return: dict ID -> patent number, without the unknown IDs
+        """
+        ids = list(dict.fromkeys(ids))
+        with self._lock:
+            unknown = [doc_id for doc_id in ids if doc_id not in self._pnks]
+        for start in range(0, len(unknown), self.batch_size):
+            batch = unknown[start:start + self.batch_size]
+            yql = {
+                "yql": "select ID, PNK from " + self.source + " where ID in (@ids)",
+                "ids": ",".join(batch),
+                "hits": len(batch)
+            }
+            response = get_vespa_client().query(yql)
+            self.queries += 1
+            with self._lock:
+                for record in response['root'].get('children', []):
+                    self._pnks[record["fields"]["ID"]] = record["fields"]["PNK"]
+                while len(self._pnks) > self.max_entries:
+                    self._pnks.popitem(last=False)
+
+        with self._lock:
+            return {doc_id: self._pnks[doc_id] for doc_id in ids if doc_id in self._pnks}
+
+
+_pnk_resolver = None
+_pnk_resolver_lock = threading.Lock()
+
+
+def get_pnk_resolver():
+    global _pnk_resolver
+    with _pnk_resolver_lock:
+        if _pnk_resolver is None:
+            _pnk_resolver = PnkResolver()
+        return _pnk_resolver
+
+
+def resolve_passage_pnks(hits):
+    """Passage hits carrying the patent number of their document instead of its ID."""
+    hits = list(hits)
+    pnks = get_pnk_resolver().resolve_many(hit.patent_no for hit in hits)
+    return [dataclasses.replace(hit, patent_no=pnks.get(hit.patent_no, hit.patent_no)) for hit in hits]
+
+
+def get_pnk_by_id(patentID: str):
+    return get_pnk_resolver().resolve_many([patentID]).get(patentID)
+
 
 def get_patent_info_from_vespa_index(field_name: str,
                                      field_value: str):
@@ -128,11 +433,8 @@ def get_patent_info_from_vespa_index(field_name: str,
     :param field_value:
     :return:
     """
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-    search_url = VESPA_ENDPOINT + "search/?query=" + field_name + ":" + field_value
-    response = requests.get(search_url).json()
-    data = response['root']['children']
+    response = get_vespa_client().get({"query": field_name + ":" + field_value})
+    data = response['root'].get('children', [])
     ti = []
     ab = []
     detd = []
@@ -151,21 +453,114 @@ def get_patent_info_from_vespa_index(field_name: str,
     return pn, pk, ti, ab, detd, clms
 
 
-def get_patent_data_by_stn_api(an: str, auth_token: str, patent_db: str):
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-    url = P4S_SEARCH_API_ENDPOINT + "database/" + patent_db + "/document/raw/" + an
-    auth = HTTPBasicAuth(P4S_SEARCH_API_USER, P4S_SEARCH_API_PASSWORD)
-    headers = {
-        "accept": "application/xml",
-        'Authorization': 'Basic',
-        'Token': auth_token
-    }
-    try:
-        response = requests.get(url, auth=auth, headers=headers)
+class StnSapiClient:
+    """
+    STN search API client with a keep-alive session. The session token is requested once and
+    reused until STN_SAPI_TOKEN_TTL seconds have passed or the API answers 401.
+    """
 
+    def __init__(self,
+                 endpoint: str = P4S_SEARCH_API_ENDPOINT,
+                 user: str = P4S_SEARCH_API_USER,
+                 password: str = P4S_SEARCH_API_PASSWORD,
+                 token_value: str = P4S_SEARCH_API_TOKEN_VALUE,
+                 token_ttl: float = STN_SAPI_TOKEN_TTL,
+                 max_connections: int = STN_SAPI_CONCURRENCY,
+                 timeout: float = STN_SAPI_TIMEOUT,
+                 clock=time.monotonic):
+        self.endpoint = endpoint
+        self.token_value = token_value
+        self.token_ttl = token_ttl
+        self.timeout = timeout
+        self.clock = clock
+        self.token_requests = 0
+        self.session = requests.Session()
+        self.session.trust_env = False
+        self.session.auth = HTTPBasicAuth(user, password)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    def _request_token(self):
+        headers = {
+            "accept": "application/json",
+            'Token': self.token_value
+        }
+        self.token_requests += 1
+        response = self.session.get(self.endpoint + "database/INPADOC/status", headers=headers, timeout=self.timeout)
+        token = response.headers.get("Token")
+        if not token:
+            raise requests.HTTPError("Failed to retrieve token. Check your credentials or API response format.",
+                                     response=response)
+        return token
+
+    def token(self, stale: str = None):
+        """
+        The cached session token, requested again once expired
+        :param stale: token rejected by the API; it is replaced unless another thread did it already
+        :return:
+        """
+        with self._token_lock:
+            if self._token is None or self.clock() >= self._token_expires or self._token == stale:
+                self._token = self._request_token()
+                self._token_expires = self.clock() + self.token_ttl
+            return self._token
+
+    def fetch_raw(self, an: str, patent_db: str):
+        """Raw XML document of an accession number."""
+        url = self.endpoint + "database/" + patent_db + "/document/raw/" + an
+        headers = {"accept": "application/xml"}
+        token = self.token()
+        response = self.session.get(url, headers={**headers, 'Token': token}, timeout=self.timeout)
+        if response.status_code == 401:
+            response = self.session.get(url, headers={**headers, 'Token': self.token(stale=token)},
+                                        timeout=self.timeout)
+        response.raise_for_status()
         return response.content.decode("utf-8")
 
+    def fetch_many(self, ans, patent_db: str, max_workers: int = STN_SAPI_CONCURRENCY):
+        """
+        Raw XML documents of many accession numbers, fetched concurrently with one shared token
+        :param ans: accession numbers
+        :param patent_db: e.g. USFULL
+        :param max_workers: number of requests in flight
+        :return: dict accession number -> XML, None for the failed ones
+        """
+        def fetch(an):
+            try:
+                return self.fetch_raw(an, patent_db)
+            except requests.exceptions.RequestException as e:
+                print(f"Error during calling STN-SAPI call: {e}")
+                return None
+
+        ans = list(ans)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(ans) or 1))) as executor:
+            return dict(zip(ans, executor.map(fetch, ans)))
+
+    def close(self):
+        self.session.close()
+
+
+_stn_sapi_client = None
+_stn_sapi_client_lock = threading.Lock()
+
+
+def get_stn_sapi_client():
+    global _stn_sapi_client
+    with _stn_sapi_client_lock:
+        if _stn_sapi_client is None:
+            _stn_sapi_client = StnSapiClient()
+        return _stn_sapi_client
+
+
+def get_patent_data_by_stn_api(an: str, auth_token: str, patent_db: str):
+    """Raw XML document of an accession number; `auth_token` is ignored, the client manages its token."""
+    try:
+        return get_stn_sapi_client().fetch_raw(an, patent_db)
+
     except requests.exceptions.RequestException as e:
         print(f"Error during calling STN-SAPI call: {e}")
 
@@ -173,22 +568,9 @@ def get_patent_data_by_stn_api(an: str, auth_token: str, patent_db: str):
 
 
 def get_stn_sapi_token(token: str):
-    os.environ['HTTP_PROXY'] = ''
-    os.environ['HTTPS_PROXY'] = ''
-    url = P4S_SEARCH_API_ENDPOINT + "database/INPADOC/status"
-    auth = HTTPBasicAuth(P4S_SEARCH_API_USER, P4S_SEARCH_API_PASSWORD)
-    headers = {
-        "accept": "application/json",
-        'Authorization': 'Basic',
-        'Token': token
-    }
+    """Cached session token of the shared SAPI client."""
     try:
-        response = requests.get(url, auth=auth, headers=headers)
-        token = response.headers.get("Token")
-        if token:
-            return token
-        else:
-            print("Failed to retrieve token. Check your credentials or API response format.")
+        return get_stn_sapi_client().token()
 
     except requests.exceptions.RequestException as e:
         print(f"Error during STN-SAPI call: {e}")
@@ -196,39 +578,84 @@ def get_stn_sapi_token(token: str):
     return None
 
 
-def extract_patent_data_by_SAPI(an: str, patent_db):
-    auth_token = get_stn_sapi_token(P4S_SEARCH_API_TOKEN_VALUE)
-    sapi_response = get_patent_data_by_stn_api(an, auth_token, patent_db)
+def parse_sapi_document(sapi_response: str):
+    """pn, pk, title, abstract, description, claims of the first member of a SAPI document."""
+    return _member_info(extract_sapi_fields(sapi_response))
+
+
+def extract_sapi_fields(sapi_response, fields=SAPI_MEMBER_FIELDS):
     """
-    cms_doc = parseString(sapi_response)
-    response = cms_doc.firstChild
-    document_response = response.firstChild
-    document = document_response.firstChild
-    doc_member = document.firstChild
-    #ti = get_element_content_by_attribute()
-    print(doc_member.nodeValue)
+    Values of the wanted fields of the first document member, collected in one streaming pass.
+    Parsed elements are cleared on the fly and the parse stops at the end of the first member,
+    so the DOM of a large full-text record is never built.
+    :param sapi_response: XML of response/documentResponse/document/member
+    :param fields: field attributes to collect
+    :return: dict field -> list of texts, in document order
     """
+    values = {name: [] for name in fields}
+    source = io.BytesIO(sapi_response.encode("utf-8") if isinstance(sapi_response, str) else sapi_response)
+    depth = 0
+    in_member = False
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == SAPI_MEMBER_DEPTH:
+                in_member = True
+            continue
+
+        depth -= 1
+        if not in_member:
+            continue
+        if depth < SAPI_MEMBER_DEPTH:
+            # end of the first member
+            break
+        name = elem.get("field")
+        if name in values:
+            values[name].append(elem.text)
+        elem.clear()
+
+    return values
+
+
+def _first(values):
+    return values[0] if values else ""
+
 
-    response = ET.fromstring(sapi_response)
-    document_response = response[0]
-    document = document_response[0]
-    document_members = document
-    # print(len(document_members.getchildren()))
+def extract_patent_data_by_SAPI(an: str, patent_db):
+    sapi_response = get_stn_sapi_client().fetch_raw(an, patent_db)
 
-    pn, pk, title, abstract, description, claims = get_patent_member_info(document_members[0])
+    return parse_sapi_document(sapi_response)
 
-    return pn, pk, title, abstract, description, claims
+
+def extract_patents_data_by_SAPI(ans, patent_db, max_workers: int = STN_SAPI_CONCURRENCY):
+    """
+    Full texts of many accession numbers: one token request, then parallel fetches
+    :param ans: accession numbers
+    :param patent_db:
+    :param max_workers:
+    :return: dict accession number -> (pn, pk, title, abstract, description, claims), None if not fetched
+    """
+    raw_documents = get_stn_sapi_client().fetch_many(ans, patent_db, max_workers)
+    return {an: parse_sapi_document(raw) if raw else None for an, raw in raw_documents.items()}
 
 
 def get_patent_member_info(document_member):
-    pn = extract_xml_element_value(document_member, "PN")[0]
-    title = extract_xml_element_value(document_member, "TIEN")[0]
-    abstract = extract_xml_element_value(document_member, "ABEN")[0]
-    description = extract_xml_element_value(document_member, "DETDEN")
-    MCLMEN = extract_xml_element_value(document_member, "MCLMEN")
-    CLMENINT = extract_xml_element_value(document_member, "CLMENINT")
-    claims = MCLMEN + CLMENINT
-    pk = extract_xml_element_value(document_member, "PK")[0]
+    values = {name: [] for name in SAPI_MEMBER_FIELDS}
+    for elem in document_member.iter():
+        name = elem.get("field")
+        if name in values and elem is not document_member:
+            values[name].append(elem.text)
+
+    return _member_info(values)
+
+
+def _member_info(values):
+    pn = _first(values["PN"])
+    title = _first(values["TIEN"])
+    abstract = _first(values["ABEN"])
+    description = values["DETDEN"]
+    claims = values["MCLMEN"] + values["CLMENINT"]
+    pk = _first(values["PK"])
 
     return pn, pk, title, abstract, description, claims
 
@@ -1,33 +1,236 @@
-import psycopg2
-import csv
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import argparse
+import gzip
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import psycopg2
+from psycopg2 import sql
+from dotenv import load_dotenv
+
+load_dotenv()
+
+POSTGRES_DB = os.getenv('POSTGRES_DB', '')
+POSTGRES_USER = os.getenv('POSTGRES_USER', '')
+POSTGRES_PASS = os.getenv('POSTGRES_PASS', '')
+POSTGRES_HOST = os.getenv('POSTGRES_HOST', '')
+POSTGRES_PORT = os.getenv('POSTGRES_PORT', '')
+
+
+def get_connection():
+    return psycopg2.connect(dbname=POSTGRES_DB, user=POSTGRES_USER, password=POSTGRES_PASS,
+                            host=POSTGRES_HOST, port=POSTGRES_PORT)
+
+
+def qualified_table(table: str):
+    """'schema.table' as a safely quoted SQL identifier."""
+    return sql.Identifier(*table.split("."))
+
+
+class ShardWriter:
+    """
+    JSON lines writer splitting the output into shards of `shard_size` rows. A shard is written
+    under a temporary name and renamed when complete, so a resumed export never reads half a shard.
+    """
+
+    def __init__(self, output_dir: str, prefix: str, shard_size: int, compress: bool = False, shard: int = 0):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.compress = compress
+        self.shard = shard
+        self.rows_in_shard = 0
+        self._file = None
+
+    def path(self, shard: int):
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        return os.path.join(self.output_dir, f"{self.prefix}-{shard:05d}{suffix}")
+
+    def write(self, record: dict):
+        """Write one record, return True when it completed a shard."""
+        if self._file is None:
+            opener = gzip.open if self.compress else open
+            self._file = opener(self.path(self.shard) + ".tmp", "wt", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.rows_in_shard += 1
+        if self.rows_in_shard >= self.shard_size:
+            self.close()
+            return True
+        return False
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self.path(self.shard) + ".tmp", self.path(self.shard))
+        self._file = None
+        self.rows_in_shard = 0
+        self.shard += 1
+
+
+def _progress_path(output_dir: str, worker: int):
+    return os.path.join(output_dir, f"progress-w{worker:02d}.json")
+
+
+def load_progress(output_dir: str, worker: int):
+    path = _progress_path(output_dir, worker)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_progress(output_dir: str, worker: int, progress: dict):
+    path = _progress_path(output_dir, worker)
+    with open(path + ".tmp", "w") as f:
+        json.dump(progress, f, default=str)
+    os.replace(path + ".tmp", path)
+
+
+def export_range(table: str,
+                 data_column: str,
+                 key_column: str,
+                 output_dir: str,
+                 lower=None,
+                 upper=None,
+                 worker: int = 0,
+                 itersize: int = 2000,
+                 shard_size: int = 100000,
+                 compress: bool = True,
+                 connect=get_connection):
+    """
+    Stream the rows with lower < key <= upper into JSON line shards through a named server-side
+    cursor, so only `itersize` rows are held in memory. The last key of every completed shard is
+    saved, a second run of the same worker resumes after it.
+    :param table: e.g. corpus.data_pt_beta
+    :param data_column: exported column, written as {"data": value} per line
+    :param key_column: unique, ordered column used for resuming and partitioning
+    :param output_dir:
+    :param lower: exclusive lower bound of the key, None for no bound
+    :param upper: inclusive upper bound of the key, None for no bound
+    :param worker: worker number, part of the shard and progress file names
+    :param itersize: rows fetched per network round trip
+    :param shard_size: rows per shard
+    :param compress: gzip the shards
+    :param connect: returns a new database connection
+    :return: number of rows exported by this run
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    progress = load_progress(output_dir, worker) or {"last_key": lower, "shard": 0, "rows": 0}
+    if progress.get("done"):
+        return 0
+
+    conditions = []
+    params = []
+    if progress["last_key"] is not None:
+        conditions.append(sql.SQL("{} > %s").format(sql.Identifier(key_column)))
+        params.append(progress["last_key"])
+    if upper is not None:
+        conditions.append(sql.SQL("{} <= %s").format(sql.Identifier(key_column)))
+        params.append(upper)
+    query = sql.SQL("SELECT {key}, {data} FROM {table}{where} ORDER BY {key}").format(
+        key=sql.Identifier(key_column),
+        data=sql.Identifier(data_column),
+        table=qualified_table(table),
+        where=sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""))
+
+    writer = ShardWriter(output_dir, f"part-w{worker:02d}", shard_size, compress, shard=progress["shard"])
+    exported = 0
+    started = time.perf_counter()
+    conn = connect()
+    try:
+        # a named cursor keeps the result set on the server and fetches it `itersize` rows at a time
+        with conn.cursor(name=f"export_w{worker:02d}") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            for key, data in cur:
+                exported += 1
+                if writer.write({"data": data}):
+                    save_progress(output_dir, worker, {"last_key": key, "shard": writer.shard,
+                                                       "rows": progress["rows"] + exported})
+                if exported % (10 * itersize) == 0:
+                    rate = exported / (time.perf_counter() - started)
+                    print(f"worker {worker}: {exported} rows, {rate:.0f} rows/sec")
+            writer.close()
+            save_progress(output_dir, worker, {"last_key": key if exported else progress["last_key"],
+                                               "shard": writer.shard, "rows": progress["rows"] + exported,
+                                               "done": True})
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"worker {worker}: exported {exported} rows in {elapsed:.1f}s "
+          f"({exported / elapsed if elapsed else 0:.0f} rows/sec)")
+    return exported
+
+
+def key_partitions(lower: int, upper: int, workers: int):
+    """
+    Split the integer keys lower..upper into `workers` contiguous (exclusive lower, inclusive upper]
+    ranges, the first one starting below `lower`.
+    """
+    step = max(1, -(-(upper - lower + 1) // workers))
+    bounds = list(range(lower - 1, upper, step)) + [upper]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def key_bounds(table: str, key_column: str, connect=get_connection):
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("SELECT MIN({key}), MAX({key}) FROM {table}").format(
+                key=sql.Identifier(key_column), table=qualified_table(table)))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+
+def export_table(table: str,
+                 data_column: str,
+                 key_column: str,
+                 output_dir: str,
+                 workers: int = 1,
+                 itersize: int = 2000,
+                 shard_size: int = 100000,
+                 compress: bool = True):
+    """
+    Export a table with `workers` processes, each one streaming its own range of an integer key.
+    :return: number of rows exported by this run
+    """
+    started = time.perf_counter()
+    if workers <= 1:
+        exported = export_range(table, data_column, key_column, output_dir, itersize=itersize,
+                                shard_size=shard_size, compress=compress)
+    else:
+        lower, upper = key_bounds(table, key_column)
+        if lower is None:
+            return 0
+        partitions = key_partitions(lower, upper, workers)
+        with ProcessPoolExecutor(max_workers=len(partitions)) as executor:
+            futures = [executor.submit(export_range, table, data_column, key_column, output_dir, lo, hi, worker,
+                                       itersize, shard_size, compress)
+                       for worker, (lo, hi) in enumerate(partitions)]
+            exported = sum(future.result() for future in futures)
+
+    elapsed = time.perf_counter() - started
+    print(f"Export complete: {exported} rows in {elapsed:.1f}s ({exported / elapsed if elapsed else 0:.0f} rows/sec)")
+    return exported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a Postgres table into JSON line shards")
+    parser.add_argument("--table", default="corpus.data_pt_beta")
+    parser.add_argument("--data-column", default="data")
+    parser.add_argument("--key-column", default="id", help="unique ordered key, integer for --workers > 1")
+    parser.add_argument("--output-dir", default="export")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--itersize", type=int, default=2000)
+    parser.add_argument("--shard-size", type=int, default=100000)
+    parser.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
 
-# Database connection
-conn = psycopg2.connect(
-    dbname="",
-    user="",
-    password="",
-    host="",
-    port=""
-)
-cur = conn.cursor()
-
-# Run the query
-query = "SELECT DATA FROM corpus.data_pt_beta limit 100;"
-cur.execute(query)
-rows = cur.fetchall()
-
-# Export to CSV
-#with open("output.csv", "w", newline="") as f:
-    #writer = csv.writer(f)
-    #writer.writerow([desc[0] for desc in cur.description])  # Column headers
-    #writer.writerows(rows)
-
-# Export to JSON
-data = [dict(zip([desc[0] for desc in cur.description], row)) for row in rows]
-with open("output.json", "w") as f:
-    json.dump(data, f, indent=4)
-
-cur.close()
-conn.close()
-print("Export complete!")
\ No newline at end of file
+    export_table(args.table, args.data_column, args.key_column, args.output_dir, workers=args.workers,
+                 itersize=args.itersize, shard_size=args.shard_size, compress=not args.no_compress)
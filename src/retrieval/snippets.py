@@ -0,0 +1,90 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import dataclasses
+import os
+import re
+
+from dotenv import load_dotenv
+
+from src.utils.lexical_scorer import bm25_scores
+
+load_dotenv()
+
+# "" returns the full texts, "local" selects the query-relevant sections of every hit,
+# "vespa" additionally asks Vespa for the dynamic summary class VESPA_SNIPPET_SUMMARY
+SNIPPET_MODE = os.getenv('SNIPPET_MODE', '')
+VESPA_SNIPPET_SUMMARY = os.getenv('VESPA_SNIPPET_SUMMARY', 'snippets')
+DESCRIPTION_CHAR_BUDGET = int(os.getenv('DESCRIPTION_CHAR_BUDGET', 4000))
+CLAIMS_CHAR_BUDGET = int(os.getenv('CLAIMS_CHAR_BUDGET', 2000))
+
+SECTION_MARKER = re.compile(r'(?=\[(?:DESC|CLM)\d+\])')
+# highlighting and separators of Vespa dynamic summaries
+VESPA_MARKUP = re.compile(r'</?hi>|<sep\s*/>')
+DEPENDENT_CLAIM = re.compile(r'\b(?:claim|claims)\s+\d+', re.IGNORECASE)
+
+
+def split_sections(text):
+    """Sections of a DETDEN/CLMEN field, split on its [DESCnnnn]/[CLMnnnn] markers."""
+    if isinstance(text, list):
+        return [section for item in text for section in split_sections(item)]
+    text = VESPA_MARKUP.sub('', text or '')
+    return [section.strip() for section in SECTION_MARKER.split(text) if section.strip()]
+
+
+def _join(sections, original):
+    return sections if isinstance(original, list) else "\n".join(sections)
+
+
+def _fill(sections, budget: int):
+    """Take sections in the given order until the character budget is used up."""
+    kept = []
+    used = 0
+    for idx, section in sections:
+        if used + len(section) > budget:
+            if kept:
+                continue
+            section = section[:budget]
+        kept.append((idx, section))
+        used += len(section)
+    return kept
+
+
+def select_description(query: str, description, budget: int = DESCRIPTION_CHAR_BUDGET):
+    """
+    Keep the description sections that match the query best, within `budget` characters
+    :param query:
+    :param description: DETDEN as a text or a list of texts
+    :param budget: maximum number of characters
+    :return: the selected sections in document order, same type as `description`
+    """
+    sections = split_sections(description)
+    if not sections or description == '-':
+        return description
+    scores = bm25_scores(query, sections)
+    ranked = sorted(enumerate(sections), key=lambda item: scores[item[0]], reverse=True)
+    kept = sorted(_fill(ranked, budget))
+    return _join([section for _, section in kept], description)
+
+
+def independent_claims(claims, budget: int = CLAIMS_CHAR_BUDGET):
+    """
+    Keep the independent claims, i.e. the claims not referring to another claim, within `budget` characters
+    :param claims: CLMEN as a text or a list of texts
+    :param budget: maximum number of characters
+    :return: the selected claims in document order, same type as `claims`
+    """
+    sections = split_sections(claims)
+    if not sections or claims == '-':
+        return claims
+    independent = [(idx, claim) for idx, claim in enumerate(sections) if not DEPENDENT_CLAIM.search(claim)]
+    kept = _fill(independent or list(enumerate(sections)), budget)
+    return _join([claim for _, claim in kept], claims)
+
+
+def project_hit(hit, query: str,
+                description_budget: int = DESCRIPTION_CHAR_BUDGET,
+                claims_budget: int = CLAIMS_CHAR_BUDGET):
+    """PatentHit reduced to the query-relevant description sections and the independent claims."""
+    return dataclasses.replace(hit,
+                               description=select_description(query, hit.description, description_budget),
+                               claims=independent_claims(hit.claims, claims_budget))
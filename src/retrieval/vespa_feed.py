@@ -0,0 +1,196 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import argparse
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+
+from src.retrieval.local_index import read_export
+from src.retrieval.patent_retrieval import VespaClient, VESPA_ENDPOINT
+from src.retrieval.snippets import split_sections
+
+load_dotenv()
+
+VESPA_NAMESPACE = os.getenv('VESPA_NAMESPACE', 'patent')
+PASSAGE_MAX_CHARS = int(os.getenv('PASSAGE_MAX_CHARS', 1000))
+PASSAGE_OVERLAP_SENTENCES = int(os.getenv('PASSAGE_OVERLAP_SENTENCES', 1))
+FEED_CONCURRENCY = int(os.getenv('FEED_CONCURRENCY', 32))
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;:])\s+(?=[A-Z0-9(\[])')
+LINE_BREAK = re.compile(r'<br\s*/?>|\[(?:DESC|CLM)\d+\]')
+INLINE_TAG = re.compile(r'<[^>]+>')
+RETRYABLE_STATUS = (429, 502, 503, 504)
+
+
+def split_sentences(text: str, max_chars: int = PASSAGE_MAX_CHARS):
+    """Sentences of a text without markup; sentences longer than `max_chars` are cut in pieces."""
+    text = INLINE_TAG.sub('', LINE_BREAK.sub(' ', text or ''))
+    text = re.sub(r'\s+', ' ', text).strip()
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentences.extend(sentence[start:start + max_chars] for start in range(0, len(sentence), max_chars))
+    return [sentence for sentence in sentences if sentence.strip()]
+
+
+def sentence_windows(text: str, max_chars: int = PASSAGE_MAX_CHARS, overlap: int = PASSAGE_OVERLAP_SENTENCES):
+    """
+    Split a text into passages of whole sentences of at most `max_chars` characters
+    :param text:
+    :param max_chars:
+    :param overlap: number of sentences repeated at the start of the next passage
+    :return: list of passages
+    """
+    windows = []
+    current = []
+    for sentence in split_sentences(text, max_chars):
+        if current and len(" ".join(current + [sentence])) > max_chars:
+            windows.append(" ".join(current))
+            current = current[-overlap:] if overlap else []
+            if current and len(" ".join(current + [sentence])) > max_chars:
+                current = []
+        current.append(sentence)
+    if current:
+        windows.append(" ".join(current))
+    return windows
+
+
+def passage_documents(fields: dict, max_chars: int = PASSAGE_MAX_CHARS, overlap: int = PASSAGE_OVERLAP_SENTENCES):
+    """
+    pt_passage documents (ID, PNK, PASSAGE, SECTION) of one exported patent document, PNK being
+    the patent number of the document, so searches of such an index may set RESOLVE_PASSAGE_PNK=false
+    :param fields: exported Vespa fields of the patent
+    :param max_chars:
+    :param overlap:
+    :return: generator of (document id, fields)
+    """
+    pnk = fields.get("PNK", "")
+    for section, code, value in (("description", "D", fields.get("DETDEN")), ("claims", "C", fields.get("CLMEN"))):
+        if not value or value == '-':
+            continue
+        number = 0
+        for text in split_sections(value):
+            for passage in sentence_windows(text, max_chars, overlap):
+                passage_id = f"{pnk}-{code}{number:04d}"
+                number += 1
+                yield passage_id, {"ID": passage_id, "PNK": pnk, "PASSAGE": passage, "SECTION": section}
+
+
+def feed_documents_from_exports(export_paths, kind: str):
+    """(document id, fields) of the exports, patent documents as such or split into passages."""
+    for path in export_paths:
+        for fields in read_export(path):
+            if kind == "passage":
+                yield from passage_documents(fields)
+            else:
+                yield fields.get("PNK", ""), fields
+
+
+class FeedStats:
+    def __init__(self):
+        self.fed = 0
+        self.failed = 0
+        self.retried = 0
+        self.started = time.perf_counter()
+
+    def docs_per_sec(self):
+        elapsed = time.perf_counter() - self.started
+        return self.fed / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.fed} documents fed, {self.failed} failed, {self.retried} retries, "
+                f"{self.docs_per_sec():.0f} docs/sec")
+
+
+def _is_retryable(error: Exception):
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+async def feed_documents(client: VespaClient,
+                         documents,
+                         schema_name: str,
+                         namespace: str = VESPA_NAMESPACE,
+                         concurrency: int = FEED_CONCURRENCY,
+                         max_retries: int = 5,
+                         backoff: float = 0.5,
+                         report_every: int = 10000):
+    """
+    Feed (document id, fields) pairs with at most `concurrency` requests in flight. The source is
+    read only as fast as Vespa accepts documents, so memory stays bounded for any export size.
+    :param client: VespaClient whose connection pool is at least `concurrency` wide
+    :param documents: iterable of (document id, fields)
+    :param schema_name: pt_doc or pt_passage
+    :param namespace:
+    :param concurrency: number of concurrent feed requests
+    :param max_retries: retries of throttled (429/503) or failed connections, with exponential back-off
+    :param backoff: first back-off in seconds
+    :param report_every: print the throughput every `report_every` documents
+    :return: FeedStats
+    """
+    stats = FeedStats()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+
+    async def feed_one(doc_id, fields):
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    await loop.run_in_executor(executor, client.put_document, namespace, schema_name, doc_id, fields)
+                    stats.fed += 1
+                    if stats.fed % report_every == 0:
+                        print(stats)
+                    return
+                except requests.RequestException as e:
+                    if attempt == max_retries or not _is_retryable(e):
+                        stats.failed += 1
+                        print(f"Feeding {doc_id} failed: {e}")
+                        return
+                    stats.retried += 1
+                    await asyncio.sleep(backoff * 2 ** attempt)
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for doc_id, fields in documents:
+            # backpressure: wait for a free slot before reading the next document
+            await slots.acquire()
+            task = asyncio.create_task(feed_one(doc_id, fields))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+
+    return stats
+
+
+def feed_exports(export_paths, schema_name: str, kind: str = "doc", endpoint: str = VESPA_ENDPOINT,
+                 namespace: str = VESPA_NAMESPACE, concurrency: int = FEED_CONCURRENCY):
+    """Feed postgres_to_json exports into the pt_doc (kind "doc") or pt_passage (kind "passage") schema."""
+    client = VespaClient(endpoint, max_connections=concurrency, max_retries=0)
+    try:
+        stats = asyncio.run(feed_documents(client, feed_documents_from_exports(export_paths, kind), schema_name,
+                                           namespace, concurrency))
+    finally:
+        client.close()
+    print(f"Feed complete: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feed postgres_to_json exports into Vespa")
+    parser.add_argument("exports", nargs="+", help="JSON/JSONL(.gz) files written by postgres_to_json")
+    parser.add_argument("--schema-name", required=True, help="e.g. pt_doc or pt_passage")
+    parser.add_argument("--kind", choices=["doc", "passage"], default="doc",
+                        help="feed the patent documents or their sentence-window passages")
+    parser.add_argument("--endpoint", default=VESPA_ENDPOINT)
+    parser.add_argument("--namespace", default=VESPA_NAMESPACE)
+    parser.add_argument("--concurrency", type=int, default=FEED_CONCURRENCY)
+    args = parser.parse_args()
+
+    feed_exports(args.exports, args.schema_name, args.kind, args.endpoint, args.namespace, args.concurrency)
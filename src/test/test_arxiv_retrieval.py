@@ -0,0 +1,84 @@
+import datetime
+import threading
+import time
+from types import SimpleNamespace
+
+from src.agents import search_agent
+from src.retrieval import arxiv_retrieval
+from src.utils import arxiv_cache
+from src.utils.arxiv_cache import ArxivMetadataCache
+
+
+def fake_article(i):
+    return SimpleNamespace(get_short_id=lambda: f"2401.0000{i}", title=f"title {i}", summary=f"abstract {i}",
+                           published=datetime.datetime(2024, 1, i + 1), pdf_url=f"http://arxiv.org/pdf/2401.0000{i}")
+
+
+class FakeClient:
+    def __init__(self):
+        self.searches = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def results(self, search):
+        with self._lock:
+            self.searches += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        yield from (fake_article(i) for i in range(search.max_results))
+        with self._lock:
+            self.in_flight -= 1
+
+
+def test_repeated_search_is_served_from_the_metadata_cache(monkeypatch):
+    client = FakeClient()
+    cache = ArxivMetadataCache(":memory:")
+    monkeypatch.setattr(arxiv_retrieval, "_arxiv_client", client)
+    monkeypatch.setattr(arxiv_cache, "_arxiv_cache", cache)
+
+    first = arxiv_retrieval.get_articles("cold plasma", topn=3)
+    second = arxiv_retrieval.get_articles("cold plasma", topn=3)
+    assert first == second
+    assert [paper["Article-No"] for paper in second["retrieved_papers"]] == ["2401.00000", "2401.00001", "2401.00002"]
+    assert client.searches == 1
+    assert cache.get_article("2401.00001")["Title"] == "title 1"
+
+
+def test_expired_search_is_fetched_again():
+    now = [1000.0]
+    cache = ArxivMetadataCache(":memory:", query_ttl_seconds=60, clock=lambda: now[0])
+    cache.put_articles("cold plasma", 1, [{"Article-No": "2401.00000", "Title": "title 0"}])
+    assert cache.get_articles("cold plasma", 1) == [{"Article-No": "2401.00000", "Title": "title 0"}]
+    now[0] += 61
+    assert cache.get_articles("cold plasma", 1) is None
+    # the article metadata itself does not expire
+    assert cache.get_article("2401.00000")["Title"] == "title 0"
+
+
+def test_concurrent_sessions_send_one_arxiv_request_at_a_time(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(arxiv_retrieval, "_arxiv_client", client)
+    monkeypatch.setattr(arxiv_cache, "_arxiv_cache", ArxivMetadataCache(":memory:"))
+
+    threads = [threading.Thread(target=arxiv_retrieval.get_articles, args=(f"topic {i}", 2)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.searches == 4
+    assert client.max_in_flight == 1
+
+
+def test_article_search_agent_summarizes_in_parallel_keeping_order(monkeypatch):
+    def slow_summary(ti, ab, body):
+        time.sleep(0.01 * (5 - int(ti.split()[-1])))
+        return "summary of " + ti
+
+    monkeypatch.setattr(arxiv_retrieval, "_arxiv_client", FakeClient())
+    monkeypatch.setattr(arxiv_cache, "_arxiv_cache", ArxivMetadataCache(":memory:"))
+    monkeypatch.setattr(search_agent, "article_summary_agent_by_gemini", slow_summary)
+
+    response = search_agent.article_search_agent("cold plasma", hits=5, max_workers=4)
+    assert [doc["summary"] for doc in response["retrieved_articles"]] == [f"summary of title {i}" for i in range(5)]
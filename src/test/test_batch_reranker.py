@@ -0,0 +1,27 @@
+from src.agents import reranker_agent
+from src.agents.reranker_agent import DocumentScore, DocumentScoreList, parse_batch_scores
+
+
+def test_batch_reranker_falls_back_for_missing_ids(monkeypatch):
+    calls = []
+
+    def fake_batch(topic, docs):
+        calls.append(list(docs))
+        # the model forgets the last document of every batch
+        return {doc_id: "4" for doc_id in list(docs)[:-1]}
+
+    monkeypatch.setattr(reranker_agent, "batch_rerank_by_gemini", fake_batch)
+    monkeypatch.setattr(reranker_agent, "patent_reranker", lambda topic, doc, model: "1")
+
+    docs = [f"doc {i}" for i in range(5)]
+    scores = reranker_agent.patent_batch_reranker("cold plasma", docs, "gemini", batch_size=3)
+    assert calls == [["D0", "D1", "D2"], ["D0", "D1"]]
+    assert scores == ["4", "4", "1", "4", "1"]
+
+
+def test_parse_batch_scores_ignores_unknown_ids_and_clamps():
+    result = DocumentScoreList(scores=[DocumentScore(id="[D0]", score=7),
+                                       DocumentScore(id="D1", score=-1),
+                                       DocumentScore(id="D9", score=3)])
+    assert parse_batch_scores(result, {"D0": "a", "D1": "b"}) == {"D0": "5", "D1": "0"}
+    assert parse_batch_scores(None, {"D0": "a"}) == {}
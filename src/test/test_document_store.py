@@ -0,0 +1,37 @@
+from src.retrieval import patent_retrieval
+from src.retrieval.hit_records import PatentHit
+from src.utils import document_store
+from src.utils.document_store import PatentDocumentStore
+
+
+def test_store_reads_memory_then_disk_and_counts_hits(tmp_path):
+    path = str(tmp_path / "documents.sqlite")
+    store = PatentDocumentStore(path, lru_size=1)
+    store.put_many({"US1": {"PNK": "US1", "DETDEN": ["long text"]}, "US2": {"PNK": "US2", "DETDEN": ["other"]}})
+
+    assert store.get("US2") == {"PNK": "US2", "DETDEN": ["other"]}
+    assert store.get_many(["US1", "US3"]) == {"US1": {"PNK": "US1", "DETDEN": ["long text"]}}
+    assert store.stats() == {"memory_hits": 1, "disk_hits": 1, "misses": 1, "hit_rate": 2 / 3, "size": 2}
+
+    # a new process finds the documents on disk
+    assert PatentDocumentStore(path).get("US1")["DETDEN"] == ["long text"]
+
+
+def test_lazy_hits_fetch_only_unknown_bodies_in_one_query(monkeypatch):
+    fetches = []
+
+    def fetch(pnks, schema_name):
+        fetches.append(list(pnks))
+        return {pnk: PatentHit(pnk, description=["description of " + pnk], claims=["claim"]) for pnk in pnks}
+
+    monkeypatch.setattr(document_store, "_document_store", PatentDocumentStore(":memory:"))
+    monkeypatch.setattr(patent_retrieval, "DOCUMENT_STORE_ENABLED", True)
+    monkeypatch.setattr(patent_retrieval, "fetch_patent_docs", fetch)
+
+    lazy_hits = [PatentHit(pnk, title=pnk, description=None, claims=None) for pnk in ("US1", "US2")]
+    patent_retrieval.load_patent_docs(lazy_hits[:1], "pt_doc", snippets="")
+    loaded = patent_retrieval.load_patent_docs(lazy_hits, "pt_doc", snippets="")
+
+    assert fetches == [["US1"], ["US2"]]
+    assert [hit.description for hit in loaded] == [["description of US1"], ["description of US2"]]
+    assert loaded[0].title == "US1"
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from langchain_core.messages import HumanMessage
+
+from src.agents import graph, search_agent
+from src.agents.state import DeepSearchState, add_new_patents
+
+
+def test_add_new_patents_drops_gathered_patent_numbers():
+    left = [{"patent number": "US1", "summary": "a"}]
+    right = [{"patent number": "US1", "summary": "b"}, {"patent number": "US2", "summary": "c"},
+             {"patent number": "US2", "summary": "d"}, "passage context"]
+    assert add_new_patents(left, right) == [{"patent number": "US1", "summary": "a"},
+                                            {"patent number": "US2", "summary": "c"}, "passage context"]
+
+
+def test_follow_up_queries_fan_out_into_concurrent_branches(monkeypatch):
+    lock = threading.Lock()
+    searched = []
+    in_flight = [0, 0]
+
+    def search(search_query, schema_name, hits, **kwargs):
+        with lock:
+            searched.append(search_query)
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        # every query finds the shared patent US0 and one patent of its own
+        return {"retrieved_patents": [{"patent number": "US0", "title": "shared", "summary": "s"},
+                                      {"patent number": f"US-{search_query}", "title": search_query,
+                                       "summary": "s"}],
+                "summaries_avoided": 0,
+                "patent_scores": {"US0": "4", f"US-{search_query}": "4"},
+                "skipped_patents": 0,
+                "llm_calls_saved": 0}
+
+    def reflection(state: DeepSearchState):
+        if state.research_loop_count == 0:
+            return {"is_sufficient": False, "follow_up_query": ["q1", "q2", "q3"], "research_loop_count": 1,
+                    "patent_search_query": "q1 q2 q3"}
+        return {"is_sufficient": True, "research_loop_count": state.research_loop_count + 1}
+
+    def review(state: DeepSearchState):
+        return {"patent_running_summary": [doc["patent number"] for doc in state.patent_research_results]}
+
+    monkeypatch.setattr(search_agent, "patent_search_agent", search)
+    monkeypatch.setattr(graph, "planning_deep_research_agent", lambda state: {"patent_search_query": "q0"})
+    monkeypatch.setattr(graph, "patent_deep_reflection", reflection)
+    monkeypatch.setattr(graph, "patent_deep_review", review)
+
+    result = graph.route_research(state=DeepSearchState).invoke(
+        {"research_topic": [HumanMessage(content="cold plasma")]})
+
+    assert sorted(searched) == ["q0", "q1", "q2", "q3"]
+    assert in_flight[1] == 3
+    assert sorted(result["patent_running_summary"]) == ["US-q0", "US-q1", "US-q2", "US-q3", "US0"]
+
+
+def test_patent_search_passes_seen_patents_and_reports_saved_calls(monkeypatch):
+    received = {}
+
+    def search(search_query, schema_name, hits, seen=None, **kwargs):
+        received["seen"] = seen
+        return {"retrieved_patents": [{"patent number": "US2", "title": "t", "summary": "s"}],
+                "summaries_avoided": 0, "patent_scores": {"US2": "4"}, "skipped_patents": 1, "llm_calls_saved": 2}
+
+    monkeypatch.setattr(search_agent, "patent_search_agent", search)
+    state = DeepSearchState(research_topic=[HumanMessage(content="cold plasma")], patent_search_query="q",
+                            research_loop_count=1, seen_patents={"US1": "4"})
+    update = search_agent.patent_search(state)
+
+    assert received["seen"] == {"US1": "4"}
+    assert update["seen_patents"] == {"US2": "4"}
+    assert update["llm_calls_saved"] == [{"loop": 1, "query": "q", "skipped_patents": 1, "llm_calls_saved": 2}]
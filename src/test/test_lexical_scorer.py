@@ -0,0 +1,24 @@
+from src.utils.lexical_scorer import tokenize, bm25_scores, lexical_prefilter
+
+docs = [
+    "Cold plasma device for skin treatment of wounds and acne",
+    "Plasma torch head for cutting structural steel",
+    "Method of water purification with ozone",
+    "Atmospheric cold plasma applicator for dermatological skin treatments",
+]
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("Methods for the treatment of Skins") == ["treatment", "skin"]
+
+
+def test_bm25_prefers_documents_covering_the_query():
+    scores = bm25_scores("cold plasma skin treatment", docs)
+    assert scores[0] > scores[1] > scores[2] == 0.0
+    assert scores[3] > scores[1]
+
+
+def test_lexical_prefilter_drops_off_topic_hits():
+    assert lexical_prefilter("cold plasma skin treatment", docs, min_score=0.5, min_keep=1) == [0, 3]
+    # the best documents are always kept
+    assert lexical_prefilter("laser hair removal", docs, min_score=0.5, min_keep=2) == [0, 1]
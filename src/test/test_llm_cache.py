@@ -0,0 +1,80 @@
+from pydantic import BaseModel
+
+from src.utils import llm_cache
+from src.utils.llm_cache import LLMCache, cached_llm_call, make_cache_key
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def test_hits_misses_and_normalized_key(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite"))
+    key = make_cache_key("gemini", "m", "score  this\n document", {"temperature": 0.0})
+    assert key == make_cache_key("gemini", "m", "score this document", {"temperature": 0.0})
+    assert key != make_cache_key("gemini", "m", "score this document", {"temperature": 0.1})
+
+    assert cache.get(key) is None
+    cache.put(key, "4")
+    assert cache.get(key) == "4"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    now = [0.0]
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite"), max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.put("a", "1")
+    now[0] = 1.0
+    cache.put("b", "2")
+    now[0] = 2.0
+    cache.get("a")
+    now[0] = 3.0
+    cache.put("c", "3")
+    # "b" is the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    now[0] = 20.0
+    assert cache.get("c") is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_cached_llm_call_bypass_and_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCache(path=str(tmp_path / "cache.sqlite")))
+    calls = []
+
+    def call():
+        calls.append(1)
+        return Answer(text="summary")
+
+    for _ in range(2):
+        result = cached_llm_call("openai", "m", "prompt", {"temperature": 0.1}, call, schema=Answer)
+        assert result == Answer(text="summary")
+    assert len(calls) == 1
+
+    # non-deterministic temperatures are never cached
+    for _ in range(2):
+        cached_llm_call("openai", "m", "prompt", {"temperature": 0.9}, call, schema=Answer)
+    cached_llm_call("openai", "m", "prompt", {"temperature": 0.1}, call, schema=Answer, bypass=True)
+    assert len(calls) == 4
+
+
+class Score(BaseModel):
+    text: str
+
+
+def test_key_separates_schemas_and_message_roles(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCache(path=str(tmp_path / "cache.sqlite")))
+
+    assert cached_llm_call("openai", "m", "prompt", {"temperature": 0.0}, lambda: Answer(text="a"),
+                           schema=Answer) == Answer(text="a")
+    # the same prompt with another output schema is not served the cached Answer
+    assert cached_llm_call("openai", "m", "prompt", {"temperature": 0.0}, lambda: Score(text="s"),
+                           schema=Score) == Score(text="s")
+
+    # the same contents under other roles are another prompt
+    cached_llm_call("openai", "m", "rules\nquestion", {"temperature": 0.0}, lambda: "system answer",
+                    message_types=["system", "human"])
+    assert cached_llm_call("openai", "m", "rules\nquestion", {"temperature": 0.0}, lambda: "human answer",
+                           message_types=["human", "human"]) == "human answer"
+    assert cached_llm_call("openai", "m", "rules\nquestion", {"temperature": 0.0}, lambda: "new answer",
+                           message_types=["system", "human"]) == "system answer"
@@ -0,0 +1,39 @@
+from src.utils import llm_cache, llm_provider
+from src.utils.llm_cache import LLMCache
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.prompts.append(prompt)
+        return FakeResponse("3")
+
+
+def test_clients_are_built_once_per_process(monkeypatch):
+    monkeypatch.setattr(llm_provider, "_clients", {})
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    first = llm_provider._get_client(("gemini", "m"), factory)
+    assert llm_provider._get_client(("gemini", "m"), factory) is first
+    assert len(built) == 1
+
+
+def test_invoke_text_uses_registry_and_cache(monkeypatch, tmp_path):
+    fake_model = FakeGenerativeModel()
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCache(path=str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(llm_provider, "get_gemini_model", lambda llm: fake_model)
+
+    for _ in range(3):
+        assert llm_provider.invoke_text('gemini', "score this", temperature=0.0, top_p=0.2, top_k=2) == "3"
+    assert fake_model.prompts == ["score this"]
@@ -0,0 +1,43 @@
+import json
+
+from src.retrieval import local_index, patent_retrieval
+from src.retrieval.local_index import LocalIndex, build_local_index
+
+EXPORT = [
+    {"data": {"PNK": "US1", "TIEN": "Cold plasma skin treatment", "ABEN": "A cold plasma device for skin.",
+              "DETDEN": ["[DESC0001] The plasma treats wounds."], "CLMEN": ["[CLM0001] 1. A device."], "RFM": 1}},
+    {"data": {"PNK": "US2", "TIEN": "Plasma torch", "ABEN": "Cutting steel with a plasma torch.", "RFM": 1}},
+    {"data": {"PNK": "US3", "TIEN": "Cold plasma skin device", "ABEN": "Family member of US1.", "RFM": 0}},
+    {"data": json.dumps({"PNK": "US4", "TIEN": "Ozone water purification", "ABEN": "Water.", "RFM": 1})},
+]
+
+
+def build(tmp_path, schema_name="pt_doc"):
+    export = tmp_path / "output.json"
+    export.write_text(json.dumps(EXPORT))
+    return build_local_index([str(export)], str(tmp_path / schema_name), kind="doc")
+
+
+def test_bm25_top_k_over_memory_mapped_postings(tmp_path):
+    assert build(tmp_path) == 4
+    index = LocalIndex(str(tmp_path / "pt_doc"))
+
+    ranked = [index.document(doc_id)["PNK"] for doc_id, _ in index.search("cold plasma skin", hits=3)]
+    assert ranked[:2] in (["US1", "US3"], ["US3", "US1"])
+    assert ranked[2] == "US2"
+    assert [index.document(doc_id)["PNK"] for doc_id, _ in index.search("ozone", hits=3)] == ["US4"]
+    assert index.search("unknown words", hits=3) == []
+
+
+def test_retrieval_backend_switches_to_local_index(tmp_path, monkeypatch):
+    build(tmp_path)
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(local_index, "_local_indexes", {})
+    monkeypatch.setattr(patent_retrieval, "RETRIEVAL_BACKEND", "local")
+
+    hits = list(patent_retrieval.iter_patent_docs("cold plasma skin", "pt_doc", rank_function="lexical", hits=5,
+                                                  snippets=""))
+    # US3 is not a representative family member (RFM=0), as filtered by the Vespa document search
+    assert [hit.patent_no for hit in hits] == ["US1", "US2"]
+    assert hits[0].description == ["[DESC0001] The plasma treats wounds."]
+    assert json.loads(patent_retrieval.search_patent_doc("ozone", "pt_doc"))["data"][0]["Patent No"] == "US4"
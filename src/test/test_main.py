@@ -0,0 +1,178 @@
+import os
+import threading
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from langchain_core.messages import HumanMessage
+
+from src.agents import graph, main
+from src.utils import llm_provider
+from src.utils.checkpointer import create_checkpointer
+
+
+def test_concurrent_sessions_share_one_compiled_graph_with_their_own_threads(monkeypatch):
+    builds = []
+    thread_ids = []
+    lock = threading.Lock()
+
+    def build(state, checkpointer=None):
+        builds.append(state)
+        return graph.route_research(state, checkpointer)
+
+    def planning(state):
+        return {"patent_search_query": state.research_topic[-1].content}
+
+    def review(state, config):
+        with lock:
+            thread_ids.append(config["configurable"]["thread_id"])
+        topic = [msg.content for msg in state.research_topic if isinstance(msg, HumanMessage)][0]
+        return {"patent_running_summary": f"report on {topic}"}
+
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    monkeypatch.setitem(main.GRAPH_BUILDERS, "report", build)
+    monkeypatch.setattr(graph, "planning_deep_research_agent", planning)
+    monkeypatch.setattr(graph, "patent_search", lambda state: {"patent_research_results": []})
+    monkeypatch.setattr(graph, "patent_deep_reflection", lambda state: {"is_sufficient": True})
+    monkeypatch.setattr(graph, "patent_deep_review", review)
+
+    reports = {}
+
+    def session(topic):
+        reports[topic] = main.run_deep_research("system", topic, "gemini")
+
+    sessions = [threading.Thread(target=session, args=(f"topic {i}",)) for i in range(4)]
+    for thread in sessions:
+        thread.start()
+    for thread in sessions:
+        thread.join()
+
+    assert len(builds) == 1
+    assert {topic: result["patent_deep_review"]["patent_running_summary"] for topic, result in reports.items()} == \
+        {f"topic {i}": f"report on topic {i}" for i in range(4)}
+    assert len(set(thread_ids)) == 4
+
+
+def test_given_thread_id_is_kept():
+    assert main.new_thread_config("session-1") == {"configurable": {"thread_id": "session-1"}}
+    assert main.new_thread_config() != main.new_thread_config()
+
+
+def test_failed_session_resumes_from_its_last_completed_node(monkeypatch):
+    calls = {"search": 0, "reflection": 0, "review": 0}
+
+    def search(state):
+        calls["search"] += 1
+        return {"patent_research_results": [{"patent number": f"US-{state.patent_search_query}",
+                                             "title": "t", "summary": "s"}]}
+
+    def reflection(state):
+        calls["reflection"] += 1
+        if state.research_loop_count == 0:
+            return {"is_sufficient": False, "follow_up_query": ["q1", "q2"], "research_loop_count": 1}
+        return {"is_sufficient": True, "research_loop_count": state.research_loop_count + 1}
+
+    def review(state):
+        calls["review"] += 1
+        if calls["review"] == 1:
+            raise TimeoutError("transient LLM failure")
+        return {"patent_running_summary": sorted(doc["patent number"] for doc in state.patent_research_results)}
+
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    monkeypatch.setattr(main, "get_checkpointer", lambda: create_checkpointer("memory"))
+    monkeypatch.setattr(graph, "planning_deep_research_agent", lambda state: {"patent_search_query": "q0"})
+    monkeypatch.setattr(graph, "patent_search", search)
+    monkeypatch.setattr(graph, "patent_deep_reflection", reflection)
+    monkeypatch.setattr(graph, "patent_deep_review", review)
+
+    thread_id = main.new_thread_id()
+    with pytest.raises(TimeoutError):
+        main.run_deep_research("system", "cold plasma", "gemini", thread_id=thread_id)
+    results = main.resume_deep_research(thread_id)
+
+    assert results["patent_deep_review"]["patent_running_summary"] == ["US-q0", "US-q1", "US-q2"]
+    assert calls == {"search": 3, "reflection": 2, "review": 2}
+    with pytest.raises(ValueError):
+        main.resume_deep_research(thread_id)
+
+
+def test_failed_session_resumes_from_a_sqlite_checkpoint(monkeypatch, tmp_path):
+    pytest.importorskip("langgraph.checkpoint.sqlite")
+    path = str(tmp_path / "checkpoints.sqlite")
+    calls = {"planning": 0, "review": 0}
+
+    def planning(state):
+        calls["planning"] += 1
+        return {"patent_search_query": "q0"}
+
+    def review(state):
+        calls["review"] += 1
+        if calls["review"] == 1:
+            raise TimeoutError("transient LLM failure")
+        return {"patent_running_summary": [doc["patent number"] for doc in state.patent_research_results]}
+
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    monkeypatch.setattr(main, "get_checkpointer", lambda: create_checkpointer("sqlite", path))
+    monkeypatch.setattr(graph, "planning_deep_research_agent", planning)
+    monkeypatch.setattr(graph, "patent_search",
+                        lambda state: {"patent_research_results": [{"patent number": "US1", "title": "t",
+                                                                    "summary": "s"}]})
+    monkeypatch.setattr(graph, "patent_deep_reflection", lambda state: {"is_sufficient": True})
+    monkeypatch.setattr(graph, "patent_deep_review", review)
+
+    thread_id = main.new_thread_id()
+    with pytest.raises(TimeoutError):
+        main.run_deep_research("system", "cold plasma", "gemini", thread_id=thread_id)
+
+    # a new process: the graph is compiled again over a new connection to the same database file
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    results = main.resume_deep_research(thread_id)
+
+    assert results["patent_deep_review"]["patent_running_summary"] == ["US1"]
+    assert calls == {"planning": 1, "review": 2}
+
+
+def test_resume_requires_a_checkpointer(monkeypatch):
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    monkeypatch.setattr(main, "get_checkpointer", lambda: None)
+    with pytest.raises(ValueError):
+        main.resume_deep_research("session-1")
+
+
+def test_ui_offers_to_resume_a_failed_session(monkeypatch):
+    calls = {"planning": 0, "reflection": 0}
+
+    def planning(state):
+        calls["planning"] += 1
+        return {"patent_search_query": "q0"}
+
+    def reflection(state):
+        calls["reflection"] += 1
+        if calls["reflection"] == 1:
+            raise TimeoutError("transient LLM failure")
+        return {"is_sufficient": True, "research_loop_count": 1}
+
+    checkpointer = create_checkpointer("memory")
+    monkeypatch.setattr(llm_provider, "warm_up_llm_clients", lambda: None)
+    monkeypatch.setattr(main, "_compiled_graphs", {})
+    monkeypatch.setattr(main, "get_checkpointer", lambda: checkpointer)
+    monkeypatch.setattr(graph, "planning_deep_research_agent", planning)
+    monkeypatch.setattr(graph, "patent_search", lambda state: {"patent_research_results": []})
+    monkeypatch.setattr(graph, "patent_deep_reflection", reflection)
+    monkeypatch.setattr(graph, "patent_deep_review",
+                        lambda state: {"patent_running_summary": "cold plasma report ## Sources: US1 :: title\n#"})
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(__file__), "..", "patent_deep_research_ui.py"))
+    app.run(timeout=30)
+    app.text_area[0].input("cold plasma")
+    app.button[0].click().run(timeout=30)
+
+    assert "transient LLM failure" in app.error[0].value
+    resume = [button for button in app.button if button.label == "Resume the failed research"]
+    assert len(resume) == 1
+
+    resume[0].click().run(timeout=30)
+    assert not app.error
+    assert any("cold plasma report" in markdown.value for markdown in app.markdown)
+    # the resumed session did not plan its queries again
+    assert calls == {"planning": 1, "reflection": 2}
@@ -0,0 +1,155 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.retrieval import embedder, patent_retrieval
+from src.retrieval.embedder import HashingEmbedder
+from src.retrieval.hit_records import PatentHit, PassageHit, iter_hits
+from src.retrieval.patent_retrieval import VespaClient
+
+HIT = {"fields": {"PNK": "US1234567B2", "TIEN": "Cold plasma", "ABEN": "abstract", "DETDEN": ["description"],
+                  "CLMEN": ["claim"], "PD": "20240101"}}
+
+
+class VespaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    clients = set()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        VespaHandler.clients.add(self.client_address)
+        body = json.dumps({"root": {"children": [HIT]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_searches_reuse_one_pooled_connection(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), VespaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = VespaClient(f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(patent_retrieval, "_vespa_client", client)
+    try:
+        for _ in range(3):
+            data = json.loads(patent_retrieval.search_patent_doc("cold plasma", "pt_doc"))
+            assert data["data"][0]["Patent No"] == "US1234567B2"
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert len(VespaHandler.clients) == 1
+
+
+def test_search_many_runs_concurrently_and_merges_with_rrf(monkeypatch):
+    rankings = {"plasma sterilization": ["A", "B", "C"], "plasma wound healing": ["C", "D", "A"]}
+    barrier = threading.Barrier(len(rankings), timeout=5)
+
+    def fake_search(query, schema_name, rank_function, hits, **kwargs):
+        # both searches must be in flight at the same time to pass the barrier
+        barrier.wait()
+        return (PassageHit(passage_id=passage_id, passage=query) for passage_id in rankings[query])
+
+    monkeypatch.setattr(patent_retrieval, "iter_patent_passages", fake_search)
+    merged = patent_retrieval.search_patent_passage_many(list(rankings), "pt_passage", hits=3)
+
+    assert [hit.passage_id for hit in merged] == ["A", "C", "B"]
+
+
+def test_hits_are_decoded_in_one_pass_without_misaligned_fields():
+    response = {"root": {"children": [{"relevance": 2.5, "fields": {"PNK": "EP1", "TIEN": "first"}},
+                                      {"fields": {"PNK": "EP2", "ABEN": "second abstract"}}]}}
+    hits = list(iter_hits(response, PatentHit))
+
+    assert hits[0] == PatentHit("EP1", title="first")
+    assert hits[0].relevance == 2.5
+    assert hits[1].abstract == "second abstract" and hits[1].title == ""
+    assert hits[1].to_dict()["Description"] == "-"
+
+
+def test_semantic_ranking_requires_a_configured_embedder(monkeypatch):
+    monkeypatch.setattr(embedder, "EMBEDDER", "")
+    monkeypatch.setattr(embedder, "_embedder", None)
+    with pytest.raises(ValueError):
+        patent_retrieval._patent_doc_query("cold plasma", "pt_doc", "hybrid", hits=10)
+    assert patent_retrieval._patent_doc_query("cold plasma", "pt_doc", "lexical", hits=10)["type"] == "weakAnd"
+
+
+def test_hybrid_query_sends_embedding_and_unknown_rank_function_fails(monkeypatch):
+    monkeypatch.setattr(embedder, "EMBEDDER", "hashing")
+    monkeypatch.setattr(embedder, "_embedder", None)
+    body = patent_retrieval._patent_doc_query("cold plasma sterilization", "pt_doc", "hybrid", hits=10)
+
+    assert "userQuery() or ({targetHits:100}nearestNeighbor(embedding, q))" in body["yql"]
+    assert body["yql"].endswith(" and RFM=1")
+    assert body["ranking"]["profile"] == "hybrid"
+    assert body["input.query(q)"] == HashingEmbedder().embed("cold plasma sterilization")
+    assert "query" not in patent_retrieval._passage_query("cold plasma", "pt_passage", "semantic", hits=10)
+
+    with pytest.raises(ValueError):
+        patent_retrieval._passage_query("cold plasma", "pt_passage", "dense", hits=10)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    hashing = HashingEmbedder(dim=64)
+    vector = hashing.embed("cold plasma wound treatment")
+
+    assert vector == HashingEmbedder(dim=64).embed("cold plasma wound treatment")
+    assert abs(sum(value * value for value in vector) - 1.0) < 1e-9
+    assert vector != hashing.embed("ozone water purification")
+
+
+def test_pnk_resolver_batches_unknown_ids_and_caches(monkeypatch):
+    bodies = []
+
+    class FakeClient:
+        def query(self, body):
+            bodies.append(body)
+            ids = body["ids"].split(",")
+            return {"root": {"children": [{"fields": {"ID": doc_id, "PNK": "PN-" + doc_id}}
+                                          for doc_id in ids if doc_id != "missing"]}}
+
+    monkeypatch.setattr(patent_retrieval, "_vespa_client", FakeClient())
+    resolver = patent_retrieval.PnkResolver("pt_doc", batch_size=2)
+
+    assert resolver.resolve_many(["a", "b", "c", "a"]) == {"a": "PN-a", "b": "PN-b", "c": "PN-c"}
+    assert [body["ids"] for body in bodies] == ["a,b", "c"]
+    # only the document schema, the passages would take the hit slots
+    assert bodies[0]["yql"] == "select ID, PNK from sources pt_doc where ID in (@ids)"
+
+    assert resolver.resolve_many(["c", "d", "missing"]) == {"c": "PN-c", "d": "PN-d"}
+    assert bodies[-1]["ids"] == "d,missing"
+    assert resolver.queries == 3
+
+
+def test_pnk_resolver_defaults_to_the_document_schema(monkeypatch):
+    monkeypatch.setattr(patent_retrieval, "VESPA_DOC_SCHEMA_NAME", "pt_doc")
+    assert patent_retrieval.PnkResolver().source == "sources pt_doc"
+    monkeypatch.setattr(patent_retrieval, "VESPA_DOC_SCHEMA_NAME", "")
+    with pytest.raises(ValueError):
+        patent_retrieval.PnkResolver()
+
+
+def test_passage_hits_carry_patent_numbers_by_default(monkeypatch):
+    class FakeClient:
+        def query(self, body):
+            if "where ID in (@ids)" in body["yql"]:
+                return {"root": {"children": [{"fields": {"ID": "doc-7", "PNK": "US20140294297A1"}}]}}
+            return {"root": {"children": [{"fields": {"ID": "p1", "PNK": "doc-7", "PASSAGE": "first"}},
+                                          {"fields": {"ID": "p2", "PNK": "EP1", "PASSAGE": "second"}}]}}
+
+    monkeypatch.setattr(patent_retrieval, "_vespa_client", FakeClient())
+    monkeypatch.setattr(patent_retrieval, "_pnk_resolver", None)
+    monkeypatch.setattr(patent_retrieval, "VESPA_DOC_SCHEMA_NAME", "pt_doc")
+    monkeypatch.setattr(patent_retrieval, "RETRIEVAL_BACKEND", "vespa")
+    assert patent_retrieval.RESOLVE_PASSAGE_PNK
+
+    hits = list(patent_retrieval.iter_patent_passages("cold plasma", "pt_passage", rank_function="lexical"))
+    # a PNK which is no document ID, as written by vespa_feed, is kept
+    assert [hit.patent_no for hit in hits] == ["US20140294297A1", "EP1"]
@@ -0,0 +1,75 @@
+import gzip
+import json
+
+import pytest
+
+from src.retrieval.postgres_to_json import export_range, key_partitions
+
+ROWS = [(key, {"PNK": f"US{key}", "TIEN": f"title {key}"}) for key in range(1, 11)]
+
+
+class FakeCursor:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.itersize = None
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params):
+        # the export passes the resume key as its first (and here only) parameter
+        self.rows = [row for row in ROWS if not params or row[0] > params[0]]
+
+    def __iter__(self):
+        for count, row in enumerate(self.rows):
+            if self.fail_after is not None and count == self.fail_after:
+                raise ConnectionError("connection lost")
+            yield row
+
+
+class FakeConnection:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.cursor_names = []
+
+    def cursor(self, name=None):
+        self.cursor_names.append(name)
+        return FakeCursor(self.fail_after)
+
+    def close(self):
+        pass
+
+
+def read_shards(output_dir):
+    records = []
+    for path in sorted(output_dir.glob("part-w00-*.jsonl.gz")):
+        with gzip.open(path, "rt") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_export_streams_shards_and_resumes_after_last_complete_shard(tmp_path):
+    failing = FakeConnection(fail_after=7)
+    with pytest.raises(ConnectionError):
+        export_range("corpus.data_pt_beta", "data", "id", str(tmp_path), shard_size=3,
+                     connect=lambda: failing)
+    assert failing.cursor_names == ["export_w00"]
+    # two complete shards survive, the interrupted third one is never renamed
+    assert len(read_shards(tmp_path)) == 6
+
+    exported = export_range("corpus.data_pt_beta", "data", "id", str(tmp_path), shard_size=3,
+                            connect=lambda: FakeConnection())
+    assert exported == 4
+    assert [record["data"]["PNK"] for record in read_shards(tmp_path)] == [f"US{key}" for key in range(1, 11)]
+    assert export_range("corpus.data_pt_beta", "data", "id", str(tmp_path), connect=lambda: FakeConnection()) == 0
+
+
+def test_key_partitions_cover_the_key_range_once():
+    partitions = key_partitions(1, 10, 3)
+
+    assert partitions == [(0, 4), (4, 8), (8, 10)]
+    assert key_partitions(5, 5, 4) == [(4, 5)]
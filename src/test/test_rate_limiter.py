@@ -0,0 +1,79 @@
+from src.utils.rate_limiter import RateLimiter, FakeClock, is_rate_limit_error
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def test_calls_pass_immediately_with_headroom():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100000, clock=clock)
+    for _ in range(20):
+        limiter.call(lambda: "3", tokens=1000)
+    # the previous fixed time.sleep(5) cost 20 * 5 = 100 seconds here
+    assert clock.slept == 0.0
+
+
+def test_requests_per_minute_is_enforced():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=10, clock=clock)
+    for _ in range(30):
+        limiter.acquire()
+    # 10 burst requests, then one request every 6 seconds
+    assert abs(clock.slept - 120.0) < 1e-6
+
+
+def test_tokens_per_minute_is_enforced():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=6000, clock=clock)
+    limiter.acquire(tokens=6000)
+    waited = limiter.acquire(tokens=3000)
+    assert abs(waited - 30.0) < 1e-6
+
+
+def test_backoff_on_rate_limit_error():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=1000, clock=clock, base_backoff=2.0)
+    answers = [ResourceExhausted("429 quota"), ResourceExhausted("429 quota"), "5"]
+
+    def flaky():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert limiter.call(flaky) == "5"
+    assert limiter.rate_limited == 2
+    assert clock.slept >= 2.0 + 4.0
+    assert limiter.backoff == 0.0
+
+
+def test_other_errors_are_raised():
+    limiter = RateLimiter(requests_per_minute=10, clock=FakeClock())
+
+    def broken():
+        raise ValueError("bad prompt")
+
+    try:
+        limiter.call(broken)
+        assert False
+    except ValueError:
+        pass
+    assert not is_rate_limit_error(ValueError("bad prompt"))
+
+
+def test_only_rate_limit_errors_are_retried():
+    class ApiError(Exception):
+        def __init__(self, message, status_code):
+            super().__init__(message)
+            self.status_code = status_code
+
+    assert not is_rate_limit_error(ValueError("US20140294297A1 not found"))
+    assert not is_rate_limit_error(ValueError("prompt of 4290 tokens is too long"))
+    assert not is_rate_limit_error(ApiError("connection to port 8429 refused", 503))
+    assert is_rate_limit_error(ApiError("Too many requests", 429))
+    assert is_rate_limit_error(RuntimeError("400 RESOURCE_EXHAUSTED: quota"))
+
+    wrapped = RuntimeError("Invoking the model failed")
+    wrapped.__cause__ = ResourceExhausted("quota")
+    assert is_rate_limit_error(wrapped)
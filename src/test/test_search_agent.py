@@ -0,0 +1,149 @@
+import time
+
+from src.agents import search_agent, summarization_agent
+from src.retrieval.hit_records import PatentHit
+from src.utils import summary_store
+from src.utils.summary_store import PatentSummaryStore
+
+
+def fake_iter_patent_docs(query, schema_name, hits, **kwargs):
+    return (PatentHit(patent_no=f"US{i}", title=f"title {i}") for i in range(hits))
+
+
+def test_patent_search_agent_keeps_hit_order_in_parallel(monkeypatch):
+    def slow_summary(ti, ab, detd, clms, model):
+        # later hits finish first
+        time.sleep(0.01 * (10 - int(ti.split()[-1])))
+        return "summary of " + ti
+
+    def rerank(topic, doc, model):
+        return "1" if doc.startswith("title 3") else "4"
+
+    monkeypatch.setattr(search_agent, "iter_patent_docs", fake_iter_patent_docs)
+    monkeypatch.setattr(summary_store, "_summary_store", PatentSummaryStore(":memory:"))
+    monkeypatch.setattr(summarization_agent, "patent_summary_agent", slow_summary)
+    monkeypatch.setattr(search_agent, "patent_reranker", rerank)
+
+    response = search_agent.patent_search_agent("cold plasma", "pt_doc", hits=8, max_workers=4)
+    numbers = [doc["patent number"] for doc in response["retrieved_patents"]]
+    assert numbers == ["US0", "US1", "US2", "US4", "US5", "US6", "US7"]
+
+
+def test_patent_search_agent_reuses_stored_summaries(monkeypatch):
+    calls = []
+
+    def summary(ti, ab, detd, clms, model):
+        calls.append(ti)
+        return "summary of " + ti
+
+    monkeypatch.setattr(summary_store, "_summary_store", PatentSummaryStore(":memory:"))
+    monkeypatch.setattr(search_agent, "iter_patent_docs", fake_iter_patent_docs)
+    monkeypatch.setattr(summarization_agent, "patent_summary_agent", summary)
+    monkeypatch.setattr(search_agent, "patent_reranker", lambda topic, doc, model: "4")
+
+    search_agent.patent_search_agent("cold plasma", "pt_doc", hits=3)
+    search_agent.patent_search_agent("plasma for water treatment", "pt_doc", hits=5)
+    assert sorted(calls) == [f"title {i}" for i in range(5)]
+
+
+def test_lexical_cascade_skips_summaries_of_off_topic_hits(monkeypatch):
+    def search(query, schema_name, hits, **kwargs):
+        return [PatentHit("US1", "Cold plasma skin treatment device"),
+                PatentHit("US2", "Plasma torch for steel cutting"),
+                PatentHit("US3", "Cold plasma wound and skin treatment"),
+                PatentHit("US4", "Ozone water purification")]
+
+    summarized = []
+
+    def summary(ti, ab, detd, clms, model):
+        summarized.append(ti)
+        return "summary"
+
+    monkeypatch.setattr(summary_store, "_summary_store", PatentSummaryStore(":memory:"))
+    monkeypatch.setattr(search_agent, "iter_patent_docs", search)
+    monkeypatch.setattr(summarization_agent, "patent_summary_agent", summary)
+    monkeypatch.setattr(search_agent, "patent_reranker", lambda topic, doc, model: "4")
+    monkeypatch.setattr(search_agent, "cascade_min_score", 0.5)
+    monkeypatch.setattr(search_agent, "cascade_min_keep", 1)
+
+    response = search_agent.patent_search_agent("cold plasma skin treatment", "pt_doc", hits=4, cascade="lexical")
+    assert [doc["patent number"] for doc in response["retrieved_patents"]] == ["US1", "US3"]
+    assert response["summaries_avoided"] == 2
+    assert len(summarized) == 2
+
+
+def test_fused_mode_makes_one_call_per_hit(monkeypatch):
+    calls = []
+
+    def summary_and_score(ti, ab, detd, clms, topic, model):
+        calls.append(ti)
+        return "summary of " + ti, "1" if ti == "title 1" else "5"
+
+    monkeypatch.setattr(summary_store, "_summary_store", PatentSummaryStore(":memory:"))
+    monkeypatch.setattr(search_agent, "iter_patent_docs", fake_iter_patent_docs)
+    monkeypatch.setattr(summarization_agent, "patent_summary_and_score_agent", summary_and_score)
+    monkeypatch.setattr(summarization_agent, "patent_reranker", lambda topic, doc, model: "4")
+
+    response = search_agent.patent_search_agent("cold plasma", "pt_doc", hits=3, fused=True)
+    assert [doc["patent number"] for doc in response["retrieved_patents"]] == ["US0", "US2"]
+    assert len(calls) == 3
+
+    # the second topic only needs the score of the stored summaries
+    response = search_agent.patent_search_agent("plasma sterilization", "pt_doc", hits=3, fused=True)
+    assert len(calls) == 3
+    assert len(response["retrieved_patents"]) == 3
+
+
+def test_patents_seen_by_earlier_loops_are_skipped(monkeypatch):
+    summarized = []
+    reranked = []
+
+    def summary(ti, ab, detd, clms, model):
+        summarized.append(ti)
+        return "summary of " + ti
+
+    def rerank(topic, doc, model):
+        reranked.append(doc)
+        return "1" if doc.startswith("title 3") else "4"
+
+    monkeypatch.setattr(summary_store, "_summary_store", PatentSummaryStore(":memory:"))
+    monkeypatch.setattr(search_agent, "iter_patent_docs", fake_iter_patent_docs)
+    monkeypatch.setattr(summarization_agent, "patent_summary_agent", summary)
+    monkeypatch.setattr(search_agent, "patent_reranker", rerank)
+
+    first = search_agent.patent_search_agent("cold plasma", "pt_doc", hits=4, batch_size=0)
+    assert first["patent_scores"] == {"US0": "4", "US1": "4", "US2": "4", "US3": "1"}
+    assert first["skipped_patents"] == 0
+
+    second = search_agent.patent_search_agent("cold plasma devices", "pt_doc", hits=6, batch_size=0,
+                                              seen=first["patent_scores"])
+    assert [doc["patent number"] for doc in second["retrieved_patents"]] == ["US4", "US5"]
+    assert len(summarized) == len(reranked) == 6
+    assert second["skipped_patents"] == 4
+    assert second["llm_calls_saved"] == 8
+
+
+def test_fused_mode_reuses_summaries_of_the_summary_only_prompt(monkeypatch):
+    fused_calls = []
+    reranked = []
+
+    def summary_and_score(ti, ab, detd, clms, topic, model):
+        fused_calls.append(ti)
+        return "summary of " + ti, "5"
+
+    def rerank(topic, doc, model):
+        reranked.append(doc)
+        return "4"
+
+    store = PatentSummaryStore(":memory:")
+    store.put("US0", summarization_agent.summary_model_name("gemini"),
+              summarization_agent.PATENT_SUMMARY_PROMPT_VERSION, "pre-warmed summary")
+    monkeypatch.setattr(summary_store, "_summary_store", store)
+    monkeypatch.setattr(search_agent, "iter_patent_docs", fake_iter_patent_docs)
+    monkeypatch.setattr(summarization_agent, "patent_summary_and_score_agent", summary_and_score)
+    monkeypatch.setattr(summarization_agent, "patent_reranker", rerank)
+
+    response = search_agent.patent_search_agent("cold plasma", "pt_doc", hits=2, fused=True)
+    assert [doc["summary"] for doc in response["retrieved_patents"]] == ["pre-warmed summary", "summary of title 1"]
+    assert fused_calls == ["title 1"]
+    assert reranked == ["title 0 pre-warmed summary"]
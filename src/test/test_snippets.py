@@ -0,0 +1,36 @@
+from src.retrieval.hit_records import PatentHit
+from src.retrieval.snippets import independent_claims, project_hit, select_description
+
+DESCRIPTION = ("[DESC0001] This section introduces the reader to various aspects of art. "
+               "[DESC0002] The cold plasma applicator treats skin wounds with a cuff electrode. "
+               "[DESC0003] Modern medicine enables physicians to treat a wide variety of infections. "
+               "[DESC0004] The controller drives the electrode of the cold plasma cuff.")
+
+CLAIMS = ["[CLM0001] 1. A wearable cold plasma system comprising a cuff.",
+          "[CLM0002] 2. The system of claim 1, wherein the cuff has electrodes.",
+          "[CLM0003] 3. A method of treating a wound with cold plasma.",
+          "[CLM0004] 4. The method according to claims 3, wherein the wound is a burn."]
+
+
+def test_description_keeps_best_matching_sections_in_document_order():
+    selected = select_description("cold plasma cuff electrode", DESCRIPTION, budget=160)
+
+    assert selected.startswith("[DESC0002]")
+    assert "[DESC0004]" in selected
+    assert "[DESC0001]" not in selected and "[DESC0003]" not in selected
+    assert len(selected) <= 161
+
+
+def test_only_independent_claims_within_budget_are_kept():
+    assert independent_claims(CLAIMS) == [CLAIMS[0], CLAIMS[2]]
+    assert independent_claims(CLAIMS, budget=70) == [CLAIMS[0]]
+
+
+def test_project_hit_leaves_other_fields_untouched():
+    hit = PatentHit("US1", title="Cold plasma", description=DESCRIPTION, claims=CLAIMS)
+    projected = project_hit(hit, "cold plasma cuff", description_budget=100, claims_budget=100)
+
+    assert projected.title == "Cold plasma" and projected.patent_no == "US1"
+    assert len(projected.description) <= 100
+    assert projected.claims == [CLAIMS[0]]
+    assert hit.description == DESCRIPTION
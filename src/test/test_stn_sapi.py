@@ -0,0 +1,74 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import xml.etree.ElementTree as ET
+
+from src.retrieval.patent_retrieval import StnSapiClient, get_patent_member_info, parse_sapi_document
+
+SAPI_DOCUMENT = """<response><documentResponse><document><member>
+<field field="PN">US 2013196558 A1</field><field field="PK">A1</field>
+<field field="TIEN">Cold plasma device</field><field field="ABEN">An abstract.</field>
+<field field="DETDEN">First paragraph.</field><field field="DETDEN">Second paragraph.</field>
+<field field="MCLMEN">1. A device.</field><field field="CLMENINT">2. The device of claim 1.</field>
+</member></document></documentResponse></response>"""
+
+
+class SapiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    issued = 0
+    valid_token = None
+    lock = threading.Lock()
+
+    def answer(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.endswith("/status"):
+            with SapiHandler.lock:
+                SapiHandler.issued += 1
+                SapiHandler.valid_token = f"token-{SapiHandler.issued}"
+            return self.answer(200, b"{}", {"Token": SapiHandler.valid_token})
+        if self.headers.get("Token") != SapiHandler.valid_token:
+            return self.answer(401)
+        return self.answer(200, SAPI_DOCUMENT.encode(), {"Content-Type": "application/xml"})
+
+    def log_message(self, *args):
+        pass
+
+
+def test_token_is_cached_and_refreshed_once_on_401():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SapiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = StnSapiClient(endpoint=f"http://127.0.0.1:{server.server_address[1]}/", user="u", password="p",
+                           token_value="t")
+    try:
+        documents = client.fetch_many([f"20131965{i:02d}" for i in range(6)], "USFULL", max_workers=3)
+        assert client.token_requests == 1
+        assert all(document == SAPI_DOCUMENT for document in documents.values())
+
+        # the server invalidates the session, every fetch still succeeds after a single refresh
+        SapiHandler.valid_token = None
+        documents = client.fetch_many([f"20131965{i:02d}" for i in range(6)], "USFULL", max_workers=3)
+        assert client.token_requests == 2
+        assert None not in documents.values()
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_single_pass_extraction_of_the_first_member():
+    second_member = '<member><field field="PN">EP 1 B1</field></member>'
+    document = SAPI_DOCUMENT.replace("</member>", "</member>" + second_member)
+
+    pn, pk, title, abstract, description, claims = parse_sapi_document(document)
+    assert (pn, pk, title, abstract) == ("US 2013196558 A1", "A1", "Cold plasma device", "An abstract.")
+    assert description == ["First paragraph.", "Second paragraph."]
+    assert claims == ["1. A device.", "2. The device of claim 1."]
+
+    member = ET.fromstring(document)[0][0][0]
+    assert get_patent_member_info(member) == (pn, pk, title, abstract, description, claims)
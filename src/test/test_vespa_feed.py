@@ -0,0 +1,70 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.retrieval.patent_retrieval import VespaClient
+from src.retrieval.vespa_feed import feed_documents, passage_documents, sentence_windows
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    documents = {}
+    throttled = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        doc_id = self.path.rsplit("/", 1)[-1]
+        with FeedHandler.lock:
+            # every document is throttled once before it is accepted
+            status = 200 if doc_id in FeedHandler.throttled else 429
+            FeedHandler.throttled.add(doc_id)
+            if status == 200:
+                FeedHandler.documents[self.path] = body["fields"]
+        answer = json.dumps({"id": doc_id}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_sentence_windows_respect_budget_and_overlap():
+    text = "First sentence is here. Second one follows. Third closes the paragraph. Fourth starts anew."
+    windows = sentence_windows(text, max_chars=50, overlap=1)
+
+    assert windows == ["First sentence is here. Second one follows.",
+                       "Second one follows. Third closes the paragraph.",
+                       "Third closes the paragraph. Fourth starts anew."]
+    assert all(len(window) <= 50 for window in windows)
+
+
+def test_passage_documents_of_description_and_claims():
+    fields = {"PNK": "US1", "DETDEN": ["[DESC0001] A plasma source. It treats skin."],
+              "CLMEN": ["[CLM0001] <b>1</b>. A device comprising:<br/> a cuff."]}
+    passages = list(passage_documents(fields, max_chars=100))
+
+    assert [doc_id for doc_id, _ in passages] == ["US1-D0000", "US1-C0000"]
+    assert passages[0][1] == {"ID": "US1-D0000", "PNK": "US1", "PASSAGE": "A plasma source. It treats skin.",
+                              "SECTION": "description"}
+    assert passages[1][1]["PASSAGE"] == "1. A device comprising: a cuff."
+
+
+def test_feed_retries_throttled_documents_against_local_stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = VespaClient(f"http://127.0.0.1:{server.server_address[1]}", max_connections=4, max_retries=0)
+    documents = ((f"US{i}", {"PNK": f"US{i}"}) for i in range(20))
+    try:
+        stats = asyncio.run(feed_documents(client, documents, "pt_doc", namespace="patent", concurrency=4,
+                                           backoff=0.001))
+    finally:
+        client.close()
+        server.shutdown()
+
+    assert (stats.fed, stats.failed, stats.retried) == (20, 0, 20)
+    assert FeedHandler.documents["/document/v1/patent/pt_doc/docid/US7"] == {"PNK": "US7"}
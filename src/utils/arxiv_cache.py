@@ -0,0 +1,79 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ARXIV_CACHE_PATH = os.getenv('ARXIV_CACHE_PATH', '.cache/arxiv.sqlite')
+# search results change when new articles are published, the article metadata does not
+ARXIV_QUERY_TTL_SECONDS = float(os.getenv('ARXIV_QUERY_TTL_SECONDS', 24 * 3600))
+
+
+class ArxivMetadataCache:
+    """arXiv search results keyed by (query, topn) and article metadata keyed by article id."""
+
+    def __init__(self, path: str = ARXIV_CACHE_PATH, query_ttl_seconds: float = ARXIV_QUERY_TTL_SECONDS,
+                 clock=time.time):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.query_ttl_seconds = query_ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS arxiv_query ("
+                           "query TEXT, topn INTEGER, article_ids TEXT, created REAL, PRIMARY KEY (query, topn))")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS arxiv_article (article_id TEXT PRIMARY KEY, metadata TEXT)")
+        self._conn.commit()
+
+    def get_articles(self, query: str, topn: int):
+        """Cached articles of a search, None if unknown or expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT article_ids, created FROM arxiv_query WHERE query = ? AND topn = ?",
+                                     (query, topn)).fetchone()
+            if row is None or self.clock() - row[1] > self.query_ttl_seconds:
+                self.misses += 1
+                return None
+            article_ids = json.loads(row[0])
+            placeholders = ",".join("?" * len(article_ids))
+            metadata = dict(self._conn.execute("SELECT article_id, metadata FROM arxiv_article "
+                                               f"WHERE article_id IN ({placeholders})", article_ids).fetchall())
+            if len(metadata) < len(article_ids):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [json.loads(metadata[article_id]) for article_id in article_ids]
+
+    def get_article(self, article_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT metadata FROM arxiv_article WHERE article_id = ?",
+                                     (article_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_articles(self, query: str, topn: int, articles):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO arxiv_article VALUES (?, ?)",
+                                   [(article["Article-No"], json.dumps(article)) for article in articles])
+            self._conn.execute("INSERT OR REPLACE INTO arxiv_query VALUES (?, ?, ?, ?)",
+                               (query, topn, json.dumps([article["Article-No"] for article in articles]),
+                                self.clock()))
+            self._conn.commit()
+
+
+_arxiv_cache = None
+_arxiv_cache_lock = threading.Lock()
+
+
+def get_arxiv_cache():
+    global _arxiv_cache
+    with _arxiv_cache_lock:
+        if _arxiv_cache is None:
+            _arxiv_cache = ArxivMetadataCache()
+        return _arxiv_cache
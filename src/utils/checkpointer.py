@@ -0,0 +1,52 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import os
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "sqlite" keeps the graph checkpoints on disk, "memory" in the process, "" disables checkpointing
+CHECKPOINT_BACKEND = os.getenv('CHECKPOINT_BACKEND', '')
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', '.cache/checkpoints.sqlite')
+
+
+def create_checkpointer(backend: str = CHECKPOINT_BACKEND, path: str = CHECKPOINT_PATH):
+    """
+    LangGraph checkpointer saving the state after every node, so a failed run resumes from its last completed node
+    :param backend: "sqlite", "memory" or "" (None, no checkpoints)
+    :param path: SQLite database of the "sqlite" backend
+    :return:
+    """
+    if not backend:
+        return None
+    if backend == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError("CHECKPOINT_BACKEND=sqlite requires the langgraph-checkpoint-sqlite package") from e
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # the saver serializes its own access to the connection
+        return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
+
+
+_checkpointer = None
+_checkpointer_created = False
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """The checkpointer shared by the compiled graphs, None when checkpointing is disabled."""
+    global _checkpointer, _checkpointer_created
+    with _checkpointer_lock:
+        if not _checkpointer_created:
+            _checkpointer = create_checkpointer()
+            _checkpointer_created = True
+        return _checkpointer
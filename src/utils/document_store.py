@@ -0,0 +1,106 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DOCUMENT_STORE_ENABLED = os.getenv('DOCUMENT_STORE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DOCUMENT_STORE_PATH = os.getenv('DOCUMENT_STORE_PATH', '.cache/patent_documents.sqlite')
+DOCUMENT_STORE_LRU_SIZE = int(os.getenv('DOCUMENT_STORE_LRU_SIZE', 512))
+
+
+class PatentDocumentStore:
+    """
+    Full texts of patent documents keyed by patent number: zlib-compressed JSON in SQLite,
+    with the most recently used documents kept decoded in memory.
+    """
+
+    def __init__(self, path: str = DOCUMENT_STORE_PATH, lru_size: int = DOCUMENT_STORE_LRU_SIZE):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lru_size = lru_size
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS patent_document ("
+                           "pnk TEXT PRIMARY KEY, body BLOB, updated REAL)")
+        self._conn.commit()
+
+    def _remember(self, pnk: str, fields: dict):
+        self._lru[pnk] = fields
+        self._lru.move_to_end(pnk)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, pnk: str):
+        return self.get_many([pnk]).get(pnk)
+
+    def get_many(self, pnks):
+        """
+        Stored documents of the patent numbers, from memory first, then from disk in one query
+        :param pnks:
+        :return: dict patent number -> fields, without the unknown ones
+        """
+        found = {}
+        with self._lock:
+            on_disk = []
+            for pnk in pnks:
+                if pnk in self._lru:
+                    self._lru.move_to_end(pnk)
+                    found[pnk] = self._lru[pnk]
+                    self.memory_hits += 1
+                else:
+                    on_disk.append(pnk)
+            if on_disk:
+                placeholders = ",".join("?" * len(on_disk))
+                rows = self._conn.execute(f"SELECT pnk, body FROM patent_document WHERE pnk IN ({placeholders})",
+                                          on_disk).fetchall()
+                for pnk, body in rows:
+                    fields = json.loads(zlib.decompress(body))
+                    self._remember(pnk, fields)
+                    found[pnk] = fields
+                self.disk_hits += len(rows)
+                self.misses += len(on_disk) - len(rows)
+        return found
+
+    def put(self, pnk: str, fields: dict):
+        self.put_many({pnk: fields})
+
+    def put_many(self, documents: dict):
+        body = [(pnk, zlib.compress(json.dumps(fields, ensure_ascii=False).encode("utf-8")), time.time())
+                for pnk, fields in documents.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO patent_document VALUES (?, ?, ?)", body)
+            self._conn.commit()
+            for pnk, fields in documents.items():
+                self._remember(pnk, fields)
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM patent_document").fetchone()[0]
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0, "size": size}
+
+
+_document_store = None
+_document_store_lock = threading.Lock()
+
+
+def get_document_store():
+    global _document_store
+    with _document_store_lock:
+        if _document_store is None:
+            _document_store = PatentDocumentStore()
+        return _document_store
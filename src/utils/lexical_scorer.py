@@ -0,0 +1,79 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import math
+import re
+from collections import Counter
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "has", "have", "how", "in", "into",
+    "is", "it", "its", "method", "methods", "of", "on", "or", "such", "that", "the", "their", "this", "to",
+    "used", "using", "what", "which", "with", "within",
+}
+
+
+def tokenize(text: str):
+    """Lower-cased word tokens without stopwords, plural 's' removed."""
+    tokens = []
+    for token in re.findall(r'[a-z0-9]+', (text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def bm25_scores(query: str, docs, k1: float = 1.2, b: float = 0.75):
+    """
+    BM25 score of every document for the query, with document frequencies taken from `docs` itself
+    :param query:
+    :param docs: list of texts
+    :param k1:
+    :param b:
+    :return: list of scores in the order of `docs`
+    """
+    query_terms = set(tokenize(query))
+    doc_terms = [Counter(tokenize(doc)) for doc in docs]
+    if not docs or not query_terms:
+        return [0.0] * len(docs)
+
+    avg_len = sum(sum(terms.values()) for terms in doc_terms) / len(docs) or 1.0
+    df = {term: sum(1 for terms in doc_terms if term in terms) for term in query_terms}
+    scores = []
+    for terms in doc_terms:
+        doc_len = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if tf == 0:
+                continue
+            idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avg_len))
+        scores.append(score)
+    return scores
+
+
+def query_coverage(query: str, doc: str):
+    """Fraction of the query terms that occur in the document."""
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return 0.0
+    return len(query_terms & set(tokenize(doc))) / len(query_terms)
+
+
+def lexical_prefilter(query: str, docs, min_score: float = 0.2, min_keep: int = 3):
+    """
+    Cheap first-stage filter: keep the documents whose BM25 score, normalized by the best score
+    of the hit list, and query coverage both reach `min_score`.
+    :param query:
+    :param docs: list of texts, e.g. title + abstract
+    :param min_score: threshold in [0, 1]
+    :param min_keep: the best `min_keep` documents are always kept
+    :return: sorted indices of the kept documents
+    """
+    scores = bm25_scores(query, docs)
+    best = max(scores, default=0.0) or 1.0
+    combined = [min(score / best, query_coverage(query, doc)) for score, doc in zip(scores, docs)]
+    kept = {idx for idx, score in enumerate(combined) if score >= min_score}
+    kept.update(sorted(range(len(docs)), key=lambda idx: combined[idx], reverse=True)[:min_keep])
+    return sorted(kept)
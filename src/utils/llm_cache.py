@@ -0,0 +1,148 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '.cache/llm_cache.sqlite')
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 100000))
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', 30 * 24 * 3600))
+# answers sampled above this temperature are not deterministic enough to be reused
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', 0.2))
+
+
+class LLMCache:
+    """
+    Disk-backed cache of LLM answers keyed on provider, model, normalized prompt and
+    generation params. Entries expire after `ttl_seconds` and the least recently used
+    ones are evicted above `max_entries`.
+    """
+
+    def __init__(self,
+                 path: str = LLM_CACHE_PATH,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 clock=time.time):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS llm_cache ("
+                           "key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute("DELETE FROM llm_cache WHERE key IN "
+                                   "(SELECT key FROM llm_cache ORDER BY accessed LIMIT ?)",
+                                   (count - self.max_entries,))
+                self.evictions += count - self.max_entries
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": size}
+
+
+def make_cache_key(provider: str, model_name: str, prompt: str, params: dict, schema_name: str = None,
+                   message_types: list = None):
+    """
+    Hash of the provider, model, whitespace-normalized prompt and generation params, plus the
+    output schema of structured answers and the message types (roles) of chat prompts.
+    """
+    normalized_prompt = re.sub(r'\s+', ' ', prompt).strip()
+    payload = json.dumps([provider, model_name, normalized_prompt, params, schema_name, message_types],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+
+def cached_llm_call(provider: str,
+                    model_name: str,
+                    prompt: str,
+                    params: dict,
+                    func,
+                    schema=None,
+                    message_types: list = None,
+                    bypass: bool = False):
+    """
+    Return the cached answer of a prompt or run `func()` and cache its answer.
+    :param provider: 'gemini' or 'openai'
+    :param model_name:
+    :param prompt: the full prompt text (template and inputs)
+    :param params: generation params, `temperature` decides whether the answer is cacheable
+    :param func: performs the LLM call and returns a text or a pydantic object of `schema`
+    :param schema: pydantic model of structured answers
+    :param message_types: types of the chat messages the prompt text was joined from, None for a text prompt
+    :param bypass: always call the LLM
+    :return:
+    """
+    temperature = params.get("temperature", 0.0) or 0.0
+    if bypass or not LLM_CACHE_ENABLED or temperature > LLM_CACHE_MAX_TEMPERATURE:
+        return func()
+
+    cache = get_llm_cache()
+    key = make_cache_key(provider, model_name, prompt, params,
+                         schema_name=schema.__name__ if schema is not None else None,
+                         message_types=message_types)
+    value = cache.get(key)
+    if value is not None:
+        return schema.model_validate_json(value) if schema is not None else value
+
+    result = func()
+    if result is not None:
+        cache.put(key, result.model_dump_json() if schema is not None else result)
+    return result
@@ -0,0 +1,161 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import os
+import threading
+
+import httpx
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+
+from src.utils.llm_cache import cached_llm_call
+from src.utils.rate_limiter import get_rate_limiter, estimate_tokens, provider_name
+
+load_dotenv()
+
+import google.generativeai as genai
+
+gemini_api_key = os.getenv('GOOGLE_API_KEY')
+openai_api_key = os.getenv('OPENAI_API_KEY')
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 20))
+
+# names used in DeepSearchState.llm / DeepSearchState.reasoning_model
+MODEL_REGISTRY = {
+    'gemini': os.getenv('GEMINI_API_MODEL'),
+    'gemini2': os.getenv('GEMINI2_API_MODEL'),
+    'gpt': os.getenv('OPENAI_API_MODEL'),
+}
+
+_clients = {}
+_clients_lock = threading.RLock()
+_warmed_up = set()
+
+
+def model_name(llm: str):
+    """Concrete model of an `llm` name, e.g. 'gemini' -> GEMINI_API_MODEL."""
+    if MODEL_REGISTRY.get(llm):
+        return MODEL_REGISTRY[llm]
+    return MODEL_REGISTRY['gpt'] if provider_name(llm) == "openai" else MODEL_REGISTRY['gemini']
+
+
+def _get_client(key, factory):
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def get_openai_http_client():
+    """Keep-alive connection pool shared by every OpenAI chat model of the process."""
+    return _get_client(("openai", "http"), lambda: httpx.Client(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+        timeout=httpx.Timeout(120.0, connect=10.0)))
+
+
+def get_gemini_model(llm: str = 'gemini'):
+    """genai.GenerativeModel built once per process and model."""
+    name = model_name(llm)
+
+    def create():
+        genai.configure(api_key=gemini_api_key)
+        return genai.GenerativeModel(name)
+
+    return _get_client(("gemini", name), create)
+
+
+def get_chat_model(llm: str, temperature: float):
+    """LangChain chat model built once per process, model and temperature."""
+    name = model_name(llm)
+    if provider_name(llm) == "openai":
+        return _get_client(("openai", name, temperature), lambda: ChatOpenAI(
+            model_name=name,
+            temperature=temperature,
+            api_key=openai_api_key,
+            http_client=get_openai_http_client()))
+
+    return _get_client(("gemini-chat", name, temperature), lambda: ChatGoogleGenerativeAI(
+        model=name,
+        temperature=temperature,
+        max_retries=2,
+        api_key=gemini_api_key))
+
+
+def prompt_text(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    return "\n".join(message.content if isinstance(message, BaseMessage) else str(message) for message in prompt)
+
+
+def prompt_message_types(prompt):
+    """Types of the chat messages of a prompt (system, human, ...), None for a text prompt."""
+    if isinstance(prompt, str):
+        return None
+    return [message.type if isinstance(message, BaseMessage) else type(message).__name__ for message in prompt]
+
+
+def invoke_text(llm: str, prompt, temperature: float, top_p: float = None, top_k: int = None):
+    """
+    Text answer of a prompt, served from the LLM cache or requested under the provider rate limit
+    :param llm: 'gemini' or 'gpt'
+    :param prompt: prompt text or list of chat messages
+    :param temperature:
+    :param top_p: Gemini sampling parameter
+    :param top_k: Gemini sampling parameter
+    :return:
+    """
+    text = prompt_text(prompt)
+    provider = provider_name(llm)
+    limiter = get_rate_limiter(llm)
+    if provider == "gemini" and isinstance(prompt, str):
+        generation_params = dict(candidate_count=1, top_p=top_p, top_k=top_k, temperature=temperature)
+        generation_params = {k: v for k, v in generation_params.items() if v is not None}
+        return cached_llm_call(provider, model_name(llm), text, generation_params,
+                               lambda: limiter.call(get_gemini_model(llm).generate_content,
+                                                    prompt,
+                                                    tokens=estimate_tokens(text),
+                                                    generation_config=genai.types.GenerationConfig(
+                                                        **generation_params)
+                                                    ).text)
+
+    return cached_llm_call(provider, model_name(llm), text, {"temperature": temperature},
+                           lambda: limiter.call(get_chat_model(llm, temperature).invoke, prompt,
+                                                tokens=estimate_tokens(text)).content,
+                           message_types=prompt_message_types(prompt))
+
+
+def invoke_structured(llm: str, prompt, schema, temperature: float):
+    """
+    Structured answer (an instance of the pydantic `schema`) of a prompt
+    :param llm: 'gemini' or 'gpt'
+    :param prompt: prompt text or list of chat messages
+    :param schema:
+    :param temperature:
+    :return:
+    """
+    text = prompt_text(prompt)
+    structured_model = get_chat_model(llm, temperature).with_structured_output(schema)
+    return cached_llm_call(provider_name(llm), model_name(llm), text, {"temperature": temperature},
+                           lambda: get_rate_limiter(llm).call(structured_model.invoke, prompt,
+                                                              tokens=estimate_tokens(text)),
+                           schema=schema, message_types=prompt_message_types(prompt))
+
+
+def warm_up_llm_clients(llms=('gemini', 'gpt')):
+    """
+    Build the clients and open their TLS connections once at startup, so the first
+    agent call does not pay the handshake. Failures are reported and ignored.
+    """
+    for llm in llms:
+        if llm in _warmed_up or not model_name(llm):
+            continue
+        try:
+            if provider_name(llm) == "openai":
+                get_chat_model(llm, 0.0).root_client.models.retrieve(model_name(llm))
+            else:
+                get_gemini_model(llm)
+                genai.get_model("models/" + model_name(llm).removeprefix("models/"))
+            _warmed_up.add(llm)
+        except Exception as e:
+            print(f"Warm-up of the {llm} client failed: {e}")
@@ -0,0 +1,202 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv('GEMINI_TOKENS_PER_MINUTE', 1000000))
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 500))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv('OPENAI_TOKENS_PER_MINUTE', 200000))
+
+
+class MonotonicClock:
+    """Wall clock used by the rate limiter in production."""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class FakeClock:
+    """Deterministic clock for tests: sleeping only advances the virtual time."""
+
+    def __init__(self, start: float = 0.0):
+        self.current = start
+        self.slept = 0.0
+
+    def now(self) -> float:
+        return self.current
+
+    def sleep(self, seconds: float):
+        self.current += seconds
+        self.slept += seconds
+
+    def advance(self, seconds: float):
+        self.current += seconds
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, now: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = float(rate_per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        self.tokens = 0.0
+
+
+class RateLimiter:
+    """
+    Per-provider limiter for requests per minute and tokens per minute.
+    Calls pass immediately while both buckets have headroom; a rate-limit error from the
+    provider blocks all callers for an exponentially growing back-off window.
+    """
+
+    def __init__(self,
+                 requests_per_minute: float,
+                 tokens_per_minute: float = None,
+                 clock=None,
+                 base_backoff: float = 2.0,
+                 max_backoff: float = 60.0):
+        self.clock = clock or MonotonicClock()
+        now = self.clock.now()
+        self.request_bucket = TokenBucket(requests_per_minute, now)
+        self.token_bucket = TokenBucket(tokens_per_minute, now) if tokens_per_minute else None
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.backoff = 0.0
+        self.blocked_until = now
+        self.waited = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens: float, now: float) -> float:
+        self.request_bucket.refill(now)
+        wait = max(self.request_bucket.wait_time(1), self.blocked_until - now)
+        if self.token_bucket is not None:
+            self.token_bucket.refill(now)
+            wait = max(wait, self.token_bucket.wait_time(tokens))
+        return wait
+
+    def acquire(self, tokens: float = 0) -> float:
+        """
+        Block until one request and `tokens` tokens are available, then consume them.
+        :param tokens: estimated number of prompt tokens of the request
+        :return: seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._wait_time(tokens, self.clock.now())
+                if wait <= 0:
+                    self.request_bucket.consume(1)
+                    if self.token_bucket is not None:
+                        self.token_bucket.consume(tokens)
+                    self.waited += waited
+                    return waited
+            self.clock.sleep(wait)
+            waited += wait
+
+    def report_rate_limited(self, retry_after: float = None):
+        """Register a 429/ResourceExhausted answer and widen the back-off window."""
+        with self._lock:
+            self.rate_limited += 1
+            self.backoff = min(self.max_backoff, self.backoff * 2 if self.backoff else self.base_backoff)
+            self.blocked_until = self.clock.now() + max(self.backoff, retry_after or 0.0)
+            # our view of the quota was too optimistic, start again from an empty bucket
+            self.request_bucket.drain()
+
+    def report_success(self):
+        with self._lock:
+            self.backoff = 0.0
+
+    def call(self, func, *args, tokens: float = 0, max_retries: int = 5, **kwargs):
+        """
+        Run `func(*args, **kwargs)` under the limiter, retrying on rate-limit errors.
+        :param func: the provider call
+        :param tokens: estimated number of prompt tokens of the request
+        :param max_retries: number of retries after a rate-limit error
+        :return: the result of `func`
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= max_retries or not is_rate_limit_error(e):
+                    raise
+                attempt += 1
+                self.report_rate_limited(getattr(e, "retry_after", None))
+                continue
+            self.report_success()
+            return result
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Detect 429 answers of the Gemini (ResourceExhausted) and OpenAI (RateLimitError) clients, also when
+    wrapped by LangChain. The message is not searched for "429", it may be a patent number or a token count.
+    """
+    while error is not None:
+        if type(error).__name__ in ("ResourceExhausted", "RateLimitError", "TooManyRequests"):
+            return True
+        if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+            return True
+        if "RESOURCE_EXHAUSTED" in str(error):
+            return True
+        error = error.__cause__
+    return False
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt (about 4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def provider_name(model: str) -> str:
+    return "openai" if 'gpt' in model else "gemini"
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """
+    Process-wide rate limiter shared by all agents calling the same provider
+    :param model: 'gemini' or 'gpt'
+    :return:
+    """
+    provider = provider_name(model)
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            if provider == "openai":
+                _rate_limiters[provider] = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+            else:
+                _rate_limiters[provider] = RateLimiter(GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE)
+        return _rate_limiters[provider]
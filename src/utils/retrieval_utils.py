@@ -1,39 +1,20 @@
-
-
-def extract_values_from_json(obj, key):
-    """Pull all values of specified key from nested JSON."""
-    arr = []
-
-    def extract(obj, arr, key):
-        """Recursively search for values of key in JSON tree."""
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                if isinstance(v, (dict, list)):
-                    extract(v, arr, key)
-                elif k == key:
-                    arr.append(v)
-        elif isinstance(obj, list):
-            for item in obj:
-                extract(item, arr, key)
-        return arr
-
-    results = extract(obj, arr, key)
-    return results
-
-def get_json_array_value(data, key):
+def reciprocal_rank_fusion(rankings, key, k: int = 60, limit: int = None):
     """
-
-    :param data:
-    :param key:
-    :return:
+    Merge several ranked hit lists with reciprocal rank fusion, keeping one hit per `key`
+    :param rankings: list of hit lists, each one ordered by its own query
+    :param key: function returning the identity of a hit, e.g. its patent number
+    :param k: RRF constant, dampens the weight of the top ranks
+    :param limit: number of merged hits to return, all if None
+    :return: merged hits, best fused score first
     """
-    value_list = list()
-    for item in data:
-        vale_list = None
-        try:
-            vale_list = item['fields'][key]
-            value_list.append(vale_list)
-        except:
-            value_list.append('-')
+    scores = {}
+    merged = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            hit_key = key(hit)
+            scores[hit_key] = scores.get(hit_key, 0.0) + 1.0 / (k + rank)
+            merged.setdefault(hit_key, hit)
 
-    return value_list
\ No newline at end of file
+    # sorted() is stable, so ties keep the order in which the hits were first seen
+    fused = sorted(merged, key=lambda hit_key: scores[hit_key], reverse=True)
+    return [merged[hit_key] for hit_key in fused[:limit]]
@@ -0,0 +1,73 @@
+# Copyright 2025 FIZ-Karlsruhe (Mustafa Sofean)
+
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PATENT_SUMMARY_STORE_PATH = os.getenv('PATENT_SUMMARY_STORE_PATH', '.cache/patent_summaries.sqlite')
+
+
+class PatentSummaryStore:
+    """
+    Topic-independent patent summaries keyed by (patent number, model, prompt version).
+    A new prompt version or model never reads summaries produced by an older one.
+    """
+
+    def __init__(self, path: str = PATENT_SUMMARY_STORE_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS patent_summary ("
+                           "pn TEXT, model TEXT, prompt_version TEXT, summary TEXT, created REAL, "
+                           "PRIMARY KEY (pn, model, prompt_version))")
+        self._conn.commit()
+
+    def get(self, pn: str, model_name: str, prompt_version: str):
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM patent_summary "
+                                     "WHERE pn = ? AND model = ? AND prompt_version = ?",
+                                     (pn, model_name, prompt_version)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, pn: str, model_name: str, prompt_version: str, summary: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO patent_summary VALUES (?, ?, ?, ?, ?)",
+                               (pn, model_name, prompt_version, summary, time.time()))
+            self._conn.commit()
+
+    def missing(self, pns, model_name: str, prompt_version: str):
+        """Patent numbers of `pns` without a stored summary."""
+        with self._lock:
+            stored = {row[0] for row in self._conn.execute("SELECT pn FROM patent_summary "
+                                                           "WHERE model = ? AND prompt_version = ?",
+                                                           (model_name, prompt_version))}
+        return [pn for pn in pns if pn not in stored]
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM patent_summary").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_summary_store = None
+_summary_store_lock = threading.Lock()
+
+
+def get_summary_store():
+    global _summary_store
+    with _summary_store_lock:
+        if _summary_store is None:
+            _summary_store = PatentSummaryStore()
+        return _summary_store
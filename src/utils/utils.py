@@ -93,5 +93,17 @@ def passage_format_sources(search_response) -> str:
 
     return formatted_text.strip()
 
+def research_results_to_str(research_results) -> str:
+    """Gathered research results as prompt context: one line per patent entry, formatted strings as they are."""
+    return "\n".join(patent_search_results_to_str({"retrieved_patents": [entry]}) if isinstance(entry, dict)
+                     else entry for entry in research_results)
+
+
+def research_sources_to_str(sources) -> str:
+    """Gathered sources in the patent_format_sources format, "#" terminating every "patent number :: title"."""
+    return patent_format_sources({"retrieved_patents": [entry for entry in sources if isinstance(entry, dict)]}) + \
+        "".join(entry for entry in sources if not isinstance(entry, dict))
+
+
 if __name__ == "__main__":
     print('hi')